@@ -3,13 +3,71 @@
 
 "Script para ejecutar el juego."
 
+import argparse
+import os
+import pygame as p
 from pyjuego.g_escenas import Director
-from escenas import EscenaInicio, EscenaTeclado
+from pyjuego.maze import Maze
+from pyjuego.maze_cache import MazeCache
+from pyjuego.recursos import recursos
+import escenas
+from escenas import (EscenaInicio, EscenaJuego, EscenaTeclado, generador,
+                     RECURSOS)
 
-def main():
-    "Ejecutar el juego."
-    director = Director("EKMAZE", (544, 544))
-    director.ejecutar(EscenaInicio())
+#Paquete de imágenes, se construye con: python -m pyjuego.paquete media PAQUETE
+PAQUETE = 'media/recursos.paq'
+RESOLUCION = (544, 544)
+#Teclas del guion de --simular; cada una se mantiene CUADROS_TECLA cuadros.
+GUION = (p.K_UP, p.K_LEFT, p.K_DOWN, p.K_RIGHT)
+CUADROS_TECLA = 30
+
+def guion(cuadro, escena):
+    "Recorre el laberinto cambiando de dirección cada CUADROS_TECLA cuadros."
+    return (GUION[cuadro // CUADROS_TECLA % len(GUION)],)
+
+def simular(cuadros, semilla=None):
+    """Juega cuadros actualizaciones de una partida sin ventana y tan rápido
+    como se pueda, con las teclas de guion(). Devuelve lo mismo que
+    Director.simular()."""
+    director = Director("EKMAZE", RESOLUCION, sin_ventana=True)
+    recursos.precargar(RECURSOS)
+    try:
+        return director.simular(EscenaJuego(semilla=semilla), cuadros, guion)
+    finally:
+        generador.shutdown()
+
+def main(argv=None):
+    """Ejecutar el juego. Con una semilla todas las partidas repiten los
+    mismos niveles, que se guardan en media/cache. Con --simular N se juegan
+    N cuadros sin ventana y se muestra cuántos por segundo."""
+    parser = argparse.ArgumentParser(description="EKMAZE")
+    parser.add_argument('semilla', nargs='?', type=int,
+                        help="semilla de los niveles")
+    parser.add_argument('--semilla', dest='opcion_semilla', type=int,
+                        help="igual que la semilla posicional")
+    parser.add_argument('--simular', type=int, metavar='N',
+                        help="simular N cuadros sin ventana")
+    args = parser.parse_args(argv)
+    semilla = args.opcion_semilla
+    if semilla is None:
+        semilla = args.semilla
+    if semilla is not None:
+        escenas.semilla_inicial = semilla
+        Maze.cache = generador.cache = MazeCache('media/cache')
+    #Todas las imágenes se leen ahora; los cambios de escena no leen disco.
+    if os.path.exists(PAQUETE):
+        recursos.abrir(PAQUETE)
+    if args.simular is not None:
+        cuadros, segundos, fps = simular(args.simular, semilla)
+        print("%d cuadros en %.2f s, %.0f cuadros por segundo"
+              % (cuadros, segundos, fps))
+        return
+    director = Director("EKMAZE", RESOLUCION)
+    recursos.precargar(RECURSOS)
+    try:
+        director.ejecutar(EscenaInicio())
+    finally:
+        generador.shutdown()
 
 if __name__ == "__main__":
     main()
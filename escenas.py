@@ -3,16 +3,23 @@
 
 import os
 import sys
-from random import choice
+import numpy
 import pygame as p
 from pgu.tilevid import Tilevid, Sprite
 from pgu import text
 from pgu.high import High
 from pyjuego.personajes import CharacterSprite
-from pyjuego.g_escenas import Escena
-from pyjuego.objetos import Texto, TecladoPantalla
-from pyjuego.funciones import cargar_imagen
-from pyjuego.maze import Maze
+from pyjuego.g_escenas import Escena, teclas_pulsadas
+from pyjuego.objetos import Texto, TecladoPantalla, renderizar
+from pyjuego.funciones import (cargar_imagen, cargar_nivel, cargar_sprites,
+                                cargar_tiles)
+from pyjuego.maze import new_seed, next_seed, stream, STREAM_ENEMIES
+from pyjuego.maze_pool import MazePool
+from pyjuego.maze_infinite import InfiniteMaze
+from pyjuego.niebla import Niebla
+from pyjuego.mosaico import Mosaico
+from pyjuego.camara import Camara
+from pyjuego.perfil import perfil
 import math
 import pprint
 
@@ -22,91 +29,142 @@ MAPA_LIBRE = 0
 MAPA_SALIDA = 4
 MAPA_INICIO = 5
 MAPA_BESTIA = 6
+#Código de la capa de códigos del motor para cada marca del mapa.
+CODIGOS = {MAPA_INICIO: 1, MAPA_BESTIA: 4}
 
 TW, TH = 32, 32     #Ancho y largo de los tiles.
+ALGORITMO = 'isles' #Generador de laberintos, ver pyjuego.maze.GENERATORS.
+ANCHO, ALTO = 16, 16    #Tamaño del laberinto en tiles.
+ADELANTO = 2        #Niveles cuyo laberinto se genera mientras se juega.
+TROZO = 16          #Lado en tiles de los trozos del modo sin fin.
+
+#Imágenes de los sprites.
+IMAGENES = [
+    #Sprites del jugador.
+    ('lp_s1', 'media/sprites/lp_s1.gif', (0, 0, 24, 24) ),
+    ('lp_s2', 'media/sprites/lp_s2.gif', (0, 0, 24, 24) ),
+    ('lp_o1', 'media/sprites/lp_o1.gif', (0, 0, 24, 24) ),
+    ('lp_o2', 'media/sprites/lp_o2.gif', (0, 0, 24, 24) ),
+    ('lp_e1', 'media/sprites/lp_e1.gif', (0, 0, 24, 24) ),
+    ('lp_e2', 'media/sprites/lp_e2.gif', (0, 0, 24, 24) ),
+    ('lp_n1', 'media/sprites/lp_n1.gif', (0, 0, 24, 24) ),
+    ('lp_n2', 'media/sprites/lp_n2.gif', (0, 0, 24, 24) ),
+    #Sprites de los no-muertos.
+    ('nm_s1', 'media/sprites/nm_s1.gif', (0, 0, 24, 24) ),
+    ('nm_s2', 'media/sprites/nm_s2.gif', (0, 0, 24, 24) ),
+    ('nm_o1', 'media/sprites/nm_o1.gif', (0, 0, 24, 24) ),
+    ('nm_o2', 'media/sprites/nm_o2.gif', (0, 0, 24, 24) ),
+    ('nm_e1', 'media/sprites/nm_e1.gif', (0, 0, 24, 24) ),
+    ('nm_e2', 'media/sprites/nm_e2.gif', (0, 0, 24, 24) ),
+    ('nm_n1', 'media/sprites/nm_n1.gif', (0, 0, 24, 24) ),
+    ('nm_n2', 'media/sprites/nm_n2.gif', (0, 0, 24, 24) ),
+]
+#Tileset del laberinto.
+TILES = 'media/niveles/tiles_ekmaze.tga'
+#Imágenes (ruta, alpha) que se precargan al iniciar el juego.
+RECURSOS = [
+    ('media/imagenes/inicio.png', False),
+    ('media/imagenes/terminado.png', True),
+    (TILES, True),
+] + [(ruta, True) for nombre, ruta, forma in IMAGENES]
 
 complejidad = 0.10
 densidad = 0.20
 nivel = 0
+semilla_inicial = None  #Semilla del primer nivel; None para una al azar.
+semilla_partida = None  #Semilla de la próxima partida, ya encargada.
+generador = MazePool()  #Procesos que generan los próximos laberintos.
+
+def claves_niveles(algoritmo, semilla, c, d):
+    """Claves de MazePool de los ADELANTO niveles que empiezan con semilla,
+    complejidad c y densidad d."""
+    claves = []
+    for i in range(ADELANTO):
+        claves.append(MazePool.key(ANCHO, ALTO, c, d, algoritmo, semilla))
+        c += 0.05
+        d += 0.02
+        semilla = next_seed(semilla)
+    return claves
+
+def encargar_partida():
+    """Elige la semilla de la próxima partida y empieza a generar sus
+    primeros niveles, para que el primero tampoco espere al generador."""
+    global semilla_partida
+    if semilla_partida is None:
+        semilla_partida = semilla_inicial
+    if semilla_partida is None:
+        semilla_partida = new_seed()
+    generador.prefetch(claves_niveles(ALGORITMO, semilla_partida,
+                                      complejidad, densidad))
 
 class EscenaJuego(Escena):
  
 
     "Clase que define la escena principal del videojuego."
-    def __init__(self, puntos=0):
-        global complejidad, densidad, nivel
-        "Inicialización de las variables del videojuego."
+    def __init__(self, puntos=0, algoritmo=None, semilla=None):
+        """Inicialización de las variables del videojuego. La semilla
+        determina el laberinto y los movimientos de los enemigos; los
+        niveles siguientes usan semillas derivadas de ella."""
+        global complejidad, densidad, nivel, semilla_partida
         Escena.__init__(self)
-                             
-        def array_load_level(self,z,bg=0):
-            w, h = z.shape
-            self.resize((w,h),bg)
-            for y in range(0,h):
-                for x in range(0,w):
-                    t = z[y,x]
-                    if t == 5: #jugador
-                        self.tlayer[y][x] = 0
-                        self.clayer[y][x] = 1
-                    elif t == 6: #enemigo
-                        self.tlayer[y][x] = 0
-                        self.clayer[y][x] = 4
-                    else :
-                        self.tlayer[y][x] = t
-                        self.clayer[y][x] = 0
-            return
+        if algoritmo is None:
+            algoritmo = ALGORITMO
+        if semilla is None:
+            semilla, semilla_partida = semilla_partida, None
+        if semilla is None:
+            semilla = semilla_inicial
+        if semilla is None:
+            semilla = new_seed()
+        self.algoritmo = algoritmo
+        self.semilla = semilla
+        self.enemigos = 0   #Enemigos creados, cada uno con su propio azar.
+        #La cámara mueve el mapa bajo toda la pantalla, así que la niebla la
+        #cubre entera.
+        self.niebla = Niebla(p.display.get_surface().get_size(), (0, 0),
+                             tile=(TW, TH), opacos=(MAPA_OCUPADO,))
+        self.mapa = None    #Vista y cambios del mapa que tiene la capa fija.
         
         self.motor = Tilevid()        
-        
-        Tilevid.array_load_level = array_load_level
            
         tiles = {
             1: ('todos', self.tile_muro, None),
             4: ('personaje', self.recoge_ruby, None),
         }
-        self.motor.tga_load_tiles('media/niveles/tiles_ekmaze.tga', (TW, TH), tiles)
+        cargar_tiles(self.motor, TILES, (TW, TH), tiles)
+        self.mosaico = Mosaico(self.motor, clave=TILES)
+        self.camara = Camara(self.motor, (TW, TH))
         
-        self.maze = Maze(16, 16, complejidad, densidad)
-        self.motor.array_load_level(self.maze.getMap(),0)
-        complejidad += 0.05
-        densidad += 0.02
+        mapa = self.cargar_laberinto()
+        cargar_nivel(self.motor, mapa, CODIGOS)
+        self.niebla.cargar(self.motor.tlayer)
                 
-        #Imágenes para los sprites.
-        imagenes = [
-            #Sprites del jugador.
-            ('lp_s1', 'media/sprites/lp_s1.gif', (0, 0, 24, 24) ),
-            ('lp_s2', 'media/sprites/lp_s2.gif', (0, 0, 24, 24) ),
-            ('lp_o1', 'media/sprites/lp_o1.gif', (0, 0, 24, 24) ),
-            ('lp_o2', 'media/sprites/lp_o2.gif', (0, 0, 24, 24) ),
-            ('lp_e1', 'media/sprites/lp_e1.gif', (0, 0, 24, 24) ),
-            ('lp_e2', 'media/sprites/lp_e2.gif', (0, 0, 24, 24) ),
-            ('lp_n1', 'media/sprites/lp_n1.gif', (0, 0, 24, 24) ),
-            ('lp_n2', 'media/sprites/lp_n2.gif', (0, 0, 24, 24) ),
-            #Sprites de los no-muertos.
-            ('nm_s1', 'media/sprites/nm_s1.gif', (0, 0, 24, 24) ),
-            ('nm_s2', 'media/sprites/nm_s2.gif', (0, 0, 24, 24) ),
-            ('nm_o1', 'media/sprites/nm_o1.gif', (0, 0, 24, 24) ),
-            ('nm_o2', 'media/sprites/nm_o2.gif', (0, 0, 24, 24) ),
-            ('nm_e1', 'media/sprites/nm_e1.gif', (0, 0, 24, 24) ),
-            ('nm_e2', 'media/sprites/nm_e2.gif', (0, 0, 24, 24) ),
-            ('nm_n1', 'media/sprites/nm_n1.gif', (0, 0, 24, 24) ),
-            ('nm_n2', 'media/sprites/nm_n2.gif', (0, 0, 24, 24) ),
-        ]
         
         self.codigos = {
             1: (self.crear_jugador, None),
             4: (self.no_muerto, None),
         }
-        self.motor.load_images(imagenes)
-        self.motor.run_codes(self.codigos, (0, 0, 16, 16))
+        cargar_sprites(self.motor, IMAGENES)
+        self.motor.run_codes(self.codigos, (0, 0) + tuple(self.motor.size))
         self.puntos = puntos
-        self.puertas = 0
-        
         #Conteo inicial de puertas.
-        for linea in self.motor.tlayer:
-            for tile in linea:
-                if tile == 4:
-                    self.puertas += 1
+        self.puertas = numpy.count_nonzero(mapa == MAPA_SALIDA)
         
+    def cargar_laberinto(self):
+        "Obtiene el laberinto del nivel y devuelve su mapa."
+        global complejidad, densidad
+        self.maze = generador.get(
+            MazePool.key(ANCHO, ALTO, complejidad, densidad, self.algoritmo,
+                         self.semilla))
+        complejidad += 0.05
+        densidad += 0.02
+        self.encargar_niveles()
+        return self.maze.getMap()
+
+    def encargar_niveles(self):
+        "Empieza a generar los laberintos de los próximos niveles."
+        generador.prefetch(claves_niveles(
+            self.algoritmo, next_seed(self.semilla), complejidad, densidad))
+
     def crear_jugador(self, motor, tile, valor):
         "Función para crear el sprite animado del jugador."
         imagenes = [
@@ -117,6 +175,9 @@ class EscenaJuego(Escena):
         ]
         jugador = CharacterSprite(imagenes, (tile.rect.x+4, tile.rect.y+4), motor, 20)
         motor.sprites.append(jugador)
+        self.jugador = jugador
+        self.niebla.seguir(jugador)
+        self.camara.seguir(jugador)
         jugador.loop = self.mover_jugador
         jugador.groups = motor.string2groups('todos,personaje')
         jugador.speed = 2
@@ -135,6 +196,8 @@ class EscenaJuego(Escena):
         no_muerto.agroups = motor.string2groups('personaje')
         no_muerto.loop = self.mover_enemigo
         no_muerto.hit = self.juego_terminado
+        no_muerto.azar = stream(self.semilla, STREAM_ENEMIES, self.enemigos)
+        self.enemigos += 1
         no_muerto.speed = 2
         no_muerto.set_movedir(0)
         
@@ -152,10 +215,10 @@ class EscenaJuego(Escena):
     def recoge_ruby(self, motor, tile, sprite):
         self.puntos += 100
         self.puertas -= 1
-        motor.set((tile.tx, tile.ty), 0)
+        self.mosaico.set((tile.tx, tile.ty), 0)
         
     def mover_jugador(self, motor, sprite):
-        teclas = p.key.get_pressed()
+        teclas = teclas_pulsadas()
         #caminos = sprite.next_are_free([0, 2, 3, 4])
         #print caminos
         if teclas[p.K_UP]:
@@ -172,69 +235,186 @@ class EscenaJuego(Escena):
         if sprite.tile_changed():
             caminos = sprite.next_are_free([0, 2, 3, 4])
             if caminos:
-                sprite.movedir = choice(caminos)
+                sprite.movedir = caminos[sprite.azar.integers(len(caminos))]
             else:
                 sprite.reverse()
         sprite.update()
         
     def juego_terminado(self, motor, sprite, objeto):
-        global nivel, complejidad, densidad
+        global nivel
         
         "Accede aquí en caso de colisión entre sprites."
         if self.puntos > 0 and ((self.puntos - nivel) == 100):
             #seguimos jugando
             nivel += 100
-            self.cambiar_escena(EscenaJuego(self.puntos))
+            self.cambiar_escena(EscenaJuego(
+                self.puntos, self.algoritmo, next_seed(self.semilla)))
         else:
-            nivel = 0
-            complejidad = 0.10
-            densidad = 0.20
-            
-            puntuaciones = High('media/puntuaciones/normal.dat')
-            if puntuaciones.check(self.puntos) == None:
-                #Aquí no alcanzo entrar.
-                self.cambiar_escena(EscenaJuegoTerminado(self.puntos))
-            else:
-                self.cambiar_escena(EscenaTeclado(self.puntos))
+            self.fin_partida()
+
+    def fin_partida(self):
+        "Termina la partida y pasa a las puntuaciones."
+        global nivel, complejidad, densidad
+        nivel = 0
+        complejidad = 0.10
+        densidad = 0.20
+        
+        puntuaciones = High('media/puntuaciones/normal.dat')
+        if puntuaciones.check(self.puntos) == None:
+            #Aquí no alcanzo entrar.
+            self.cambiar_escena(EscenaJuegoTerminado(self.puntos))
+        else:
+            self.cambiar_escena(EscenaTeclado(self.puntos))
                 
     def actualizar(self):
         "Actualiza los objetos del juego."
         if self.puertas:
-            self.motor.loop()
+            self.camara.actualizar()
         else:
             self.juego_terminado(None, None, None)
             
     def dibujar(self, pantalla):
-        "Dibujar objetos en pantalla."
+        """Dibuja los sprites en su posición interpolada entre las dos últimas
+        actualizaciones."""
+        sprites = list(self.motor.sprites)
+        for sprite in sprites:
+            sprite.interpolar(self.alfa)
+        try:
+            return self.pintar(pantalla)
+        finally:
+            for sprite in sprites:
+                sprite.restaurar()
+
+    def pintar(self, pantalla):
+        """Dibujar objetos en pantalla, con la vista centrada en el jugador.
+        El mapa visible se guarda en la capa fija y sólo se vuelve a pintar
+        cuando la vista se mueve o cambia un tile; en los demás cuadros se
+        restauran de ella las áreas de los sprites, la niebla y la
+        puntuación del cuadro anterior."""
         
-        self.motor.paint(pantalla)
+        self.camara.enfocar(pantalla.get_size())
+        mapa = (self.motor.view.topleft, self.mosaico.cambios)
+        with perfil.tramo('mosaico'):
+            if self.capa_fija is None or mapa != self.mapa:
+                if self.capa_fija is None:
+                    self.capa_fija = pantalla.copy()
+                #Lo que quede fuera del mapa no debe mostrar la vista vieja.
+                self.capa_fija.fill((0, 0, 0))
+                self.mosaico.pintar_mapa(self.capa_fija)
+                self.mapa = mapa
+                self.sucios = None
+            if self.sucios is None:
+                pantalla.blit(self.capa_fija, (0, 0))
+            else:
+                for rect in self.sucios:
+                    pantalla.blit(self.capa_fija, rect, rect)
+            rects = self.mosaico.pintar_sprites(pantalla)
 
-        fuente = p.font.Font(None, 36)
-        puntuacion = fuente.render('%07d' % self.puntos, True, (255,255,255))
-        x = pantalla.get_size()[0] - puntuacion.get_width()
-        y = pantalla.get_size()[1] - puntuacion.get_height()
-        pantalla.blit(puntuacion, (x, y))
+        with perfil.tramo('hud'):
+            puntuacion = renderizar('%07d' % self.puntos, 36,
+                                    color=(255,255,255))
+            x = pantalla.get_size()[0] - puntuacion.get_width()
+            y = pantalla.get_size()[1] - puntuacion.get_height()
+            rects.append(pantalla.blit(puntuacion, (x, y)))
         
-        # fog of war
-        # get coordinates from player current pos
-        for sprite in self.motor.sprites:
-            if sprite.imglists[0][0] =='lp_s1':
-                coords = [sprite.rect.x,sprite.rect.y]
-                break
-
-        s = p.Surface((480, 480), flags=p.SRCALPHA)
-        for y in range(0, 480, 16):
-            for x in range(0, 480, 16):
-                fog1 = (x-coords[0])*(x-coords[0]) + (y-coords[1])*(y-coords[1])
-                fog = fog1/200
-                if fog > 225:
-                    fog = 225
-                p.draw.rect(s, (0, 0, 0, fog), (x, y, 16, 16), 16)
-
-        pantalla.blit(s, (32, 32))
+        #Niebla de guerra alrededor del jugador.
+        with perfil.tramo('niebla'):
+            niebla = self.niebla.dibujar(pantalla, self.motor.view.topleft)
+        if niebla is not None:
+            rects.append(niebla)
+        anteriores = self.sucios
+        self.sucios = rects
+        if anteriores is None:
+            return None
+        return anteriores + rects
+
+class EscenaInfinita(EscenaJuego):
+    """Modo sin fin. El laberinto se genera por trozos de TROZO tiles
+    alrededor del jugador y en el motor sólo está la ventana de 3x3 trozos
+    con el del jugador en el centro, que la cámara sigue. Cada rubí suma
+    puntos; la partida termina al chocar con un enemigo."""
+    def __init__(self, puntos=0, algoritmo=None, semilla=None):
+        "Inicialización del modo sin fin."
+        self.jugador = None
+        EscenaJuego.__init__(self, puntos, algoritmo, semilla)
+
+    def cargar_laberinto(self):
+        "Crea el laberinto sin fin y devuelve la ventana inicial."
+        self.laberinto = InfiniteMaze(self.semilla, TROZO, self.algoritmo,
+                                      complejidad, densidad)
+        #El trozo (0, 0), con la salida, queda en el centro.
+        self.trozo = (0, 0)
+        self.origen = (-TROZO, -TROZO)
+        return self.ventana()
+
+    def ventana(self):
+        """Mapa de los 3x3 trozos desde self.origen, con el borde cerrado
+        para que ningún sprite salga de la ventana. El borde queda fuera de
+        la vista mientras el jugador está en el trozo central."""
+        z = self.laberinto.region(self.origen[0], self.origen[1],
+                                  3 * TROZO, 3 * TROZO)
+        z[0, :] = z[-1, :] = MAPA_OCUPADO
+        z[:, 0] = z[:, -1] = MAPA_OCUPADO
+        return z
+
+    def crear_jugador(self, motor, tile, valor):
+        "Crea al jugador sólo la primera vez que aparece su casilla."
+        if self.jugador is None:
+            EscenaJuego.crear_jugador(self, motor, tile, valor)
+
+    def recoge_ruby(self, motor, tile, sprite):
+        "Recoge el rubí también del laberinto, para que no reaparezca."
+        EscenaJuego.recoge_ruby(self, motor, tile, sprite)
+        self.laberinto.set(self.origen[0] + tile.tx, self.origen[1] + tile.ty,
+                           MAPA_LIBRE)
+
+    def juego_terminado(self, motor, sprite, objeto):
+        "En el modo sin fin sólo se termina al chocar con un enemigo."
+        self.fin_partida()
+
+    def actualizar(self):
+        "Actualiza los objetos y mueve la ventana si el jugador cambia de trozo."
+        self.camara.actualizar()
+        self.recentrar()
+
+    def recentrar(self):
+        """Carga la ventana centrada en el trozo del jugador, desplaza los
+        sprites con ella y crea los enemigos de los trozos que entran."""
+        x = self.origen[0] + self.jugador.rect.centerx // TW
+        y = self.origen[1] + self.jugador.rect.centery // TH
+        trozo = self.laberinto.chunk_of(x, y)
+        if trozo == self.trozo:
+            return
+        dx = (trozo[0] - self.trozo[0]) * TROZO
+        dy = (trozo[1] - self.trozo[1]) * TROZO
+        anteriores = set((self.trozo[0] + i, self.trozo[1] + j)
+                         for i in (-1, 0, 1) for j in (-1, 0, 1))
+        self.trozo = trozo
+        self.origen = (self.origen[0] + dx, self.origen[1] + dy)
+        #Los trozos lejanos se descartan para acotar la memoria.
+        self.laberinto.evict(x, y, 1)
+        cargar_nivel(self.motor, self.ventana(), CODIGOS)
+        self.niebla.cargar(self.motor.tlayer)
+        self.mosaico.invalidar()
+        ventana = p.Rect(0, 0, 3 * TROZO * TW, 3 * TROZO * TH)
+        for sprite in list(self.motor.sprites):
+            sprite.desplazar(-dx * TW, -dy * TH)
+            if sprite.tile is not None:
+                sprite.tile = (sprite.tile[0] - dx, sprite.tile[1] - dy)
+            if sprite._tile is not None:
+                sprite._tile = (sprite._tile[0] - dx, sprite._tile[1] - dy)
+            if not ventana.contains(sprite.rect):
+                self.motor.sprites.remove(sprite)
+        for i in (-1, 0, 1):
+            for j in (-1, 0, 1):
+                if (trozo[0] + i, trozo[1] + j) not in anteriores:
+                    self.motor.run_codes(self.codigos, ((i + 1) * TROZO,
+                        (j + 1) * TROZO, TROZO, TROZO))
 
 class EscenaInicio(Escena):
     "Escena inicial del videojuego."
+    inactiva = True     #Sólo cambia al pulsar una tecla.
+
     def __init__(self):
         "Inicio del juego."
         Escena.__init__(self)
@@ -242,9 +422,12 @@ class EscenaInicio(Escena):
         p.mouse.set_visible(False)
         #Elementos gráficos.
         self.fondo = cargar_imagen("inicio.png", dirs="media/imagenes")
+        #El primer nivel se genera mientras se elige.
+        encargar_partida()
         #Opciones del menú.
         self.opcs = [
             ('Nuevo Juego',),
+            ('Sin Fin',),
             ('Puntuaciones',),
             ('Salir',),
         ]
@@ -265,20 +448,24 @@ class EscenaInicio(Escena):
                     self.opc += 1
                     if self.opc >= len(self.opcs):
                         self.opc = 0
+                    self.invalidar()
                 elif evento.key == p.K_UP:
                     self.opc -= 1
                     if self.opc < 0:
                         self.opc = len(self.opcs) - 1
+                    self.invalidar()
                 elif evento.key == p.K_RETURN or evento.key == p.K_KP_ENTER:
                     if self.opc == 0:
                         self.cambiar_escena(EscenaJuego())
-                    if self.opc == 1:
-                        self.cambiar_escena(EscenaPuntuaciones())
+                    elif self.opc == 1:
+                        self.cambiar_escena(EscenaInfinita())
                     elif self.opc == 2:
+                        self.cambiar_escena(EscenaPuntuaciones())
+                    elif self.opc == 3:
                         sys.exit(0)
 
-    def dibujar(self, pantalla):
-        "Mostrar pantalla inicial."
+    def dibujar_fijo(self, pantalla):
+        "Pantalla inicial; sólo cambia al moverse por el menú."
         pantalla.blit(self.fondo, (0, 0))
         #Dibujando las opciones
         x, y = 16, 400
@@ -299,6 +486,8 @@ class EscenaInicio(Escena):
             
 class EscenaJuegoTerminado(Escena):
     "Escena presentada tras perder en el juego."
+    inactiva = True     #Sólo cambia al pulsar una tecla.
+
     def __init__(self, puntos=0):
         global complejidad, densidad
         
@@ -308,6 +497,8 @@ class EscenaJuegoTerminado(Escena):
         p.mouse.set_visible(False)
         #Elementos gráficos.
         self.fondo = cargar_imagen("terminado.png", True, "media/imagenes")
+        #El primer nivel se genera mientras se elige.
+        encargar_partida()
         #Opciones del menú.
         self.opcs = [
             ('Reiniciar', 'F5'),
@@ -344,12 +535,23 @@ class EscenaJuegoTerminado(Escena):
                     elif self.opc == 2:
                         sys.exit(0)
 
-    def dibujar(self, pantalla):
-        "Mostrar pantalla inicial."
+    def dibujar_fijo(self, pantalla):
+        "Fondo sobre la última imagen del juego y puntuación final."
+        pantalla.blit(self.fondo, (0, 0))
+        #Dibujando la puntuación final
+        texto = Texto(u"Puntuación Final", tamano=32, color=(255,255,255))
+        puntos = Texto(str(self.puntos), tamano=72, color=(255,255,255))
+        x = pantalla.get_size()[0] / 2 - puntos.rect.centerx
+        pantalla.blit(puntos.mostrar(), (x, 100))
+        x = pantalla.get_size()[0] / 2 - texto.rect.centerx
+        pantalla.blit(texto.mostrar(), (x, 72))
+
+    def dibujar_variable(self, pantalla):
+        "Opciones del menú."
         if self.opc == -1:
-            pantalla.blit(self.fondo, (0, 0))
             self.opc = 0
         #Dibujando las opciones
+        rects = []
         x, y = 0, 400
         for i in range(len(self.opcs)):
             sombra = Texto(self.opcs[i][0], tamano=28, color=(0,0,0x33))
@@ -359,18 +561,14 @@ class EscenaJuegoTerminado(Escena):
                 texto  = Texto(self.opcs[i][0], tamano=28, color=(255,255,255))
             x = (pantalla.get_size()[0] / (len(self.opcs) + 1))*(i+1)
             x -= texto.rect.centerx
-            pantalla.blit(sombra.mostrar(), (x+1, y+1))
-            pantalla.blit(texto.mostrar(), (x, y))
-        #Dibujando la puntuación final
-        texto = Texto(u"Puntuación Final", tamano=32, color=(255,255,255))
-        puntos = Texto(str(self.puntos), tamano=72, color=(255,255,255))
-        x = pantalla.get_size()[0] / 2 - puntos.rect.centerx
-        pantalla.blit(puntos.mostrar(), (x, 100))
-        x = pantalla.get_size()[0] / 2 - texto.rect.centerx
-        pantalla.blit(texto.mostrar(), (x, 72))
+            rects.append(pantalla.blit(sombra.mostrar(), (x+1, y+1)))
+            rects.append(pantalla.blit(texto.mostrar(), (x, y)))
+        return rects
         
 class EscenaPuntuaciones(Escena):
     "Escena para mostrar las puntuaciones más altas."
+    inactiva = True     #Sólo cambia al pulsar una tecla.
+
     def __init__(self, pos = None):
         "Inicializa los objetos necesarios y verifica la existencia de archivo."
         Escena.__init__(self)
@@ -398,8 +596,8 @@ class EscenaPuntuaciones(Escena):
                 if evento.key == p.K_RETURN or evento.key == p.K_KP_ENTER:
                     self.cambiar_escena(EscenaInicio())
 
-    def dibujar(self, pantalla):
-        "Mostrar pantalla inicial."
+    def dibujar_fijo(self, pantalla):
+        "Tabla de puntuaciones; no cambia mientras se muestra."
         pantalla.blit(self.fondo, (0, 0))
         datos = self.puntuaciones   #Alias de puntuaciones para evitar escribir.
         #Dibujando las puntuaciones.
@@ -437,6 +635,8 @@ class EscenaPuntuaciones(Escena):
         
 class EscenaTeclado(Escena):
     "Escena para introducir el nombre del jugador."
+    inactiva = True     #Sólo cambia al pulsar una tecla.
+
     def __init__(self, puntos = 0):
         "Inicializa los objetos necesarios."
         Escena.__init__(self)
@@ -466,15 +666,21 @@ class EscenaTeclado(Escena):
             else:
                 self.teclado.completado = False
 
-    def dibujar(self, pantalla):
-        "Mostrar teclado en pantalla."
+    def dibujar_fijo(self, pantalla):
+        "Fondo y título."
         pantalla.blit(self.fondo, (0, 0))
         pantalla.blit(self.trans, (0, 0))
-        self.teclado.dibujar_teclado(pantalla, 24, pos_y=172, inc_y=36)
-        self.teclado.dibujar_display(pantalla, 32, pos_y=64)
-        self.teclado.dibujar_comandos(pantalla, 24)
         texto = Texto(u"¡Nueva puntuación alta!", tamano=36, color=(255,255,99))
         x = pantalla.get_size()[0] / 2 - texto.rect.centerx
         pantalla.blit(texto.mostrar(), (x, 10))
 
+    def dibujar_variable(self, pantalla):
+        "Mostrar teclado en pantalla."
+        #Todo el teclado en un solo blits.
+        teclado = self.teclado
+        return pantalla.blits(
+            teclado.piezas_teclado(pantalla, 24, pos_y=172, inc_y=36) +
+            teclado.piezas_display(pantalla, 32, pos_y=64) +
+            teclado.piezas_comandos(pantalla, 24))
+
         
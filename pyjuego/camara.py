@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cámara que sigue a un sprite por el mapa de un motor de PGU y limita el
+trabajo de cada cuadro a lo que está cerca de la vista.
+"""
+
+import pygame as p
+
+class Camara():
+    """Mueve motor.view para seguir a un sprite sin salir del mapa.
+
+    actualizar() sustituye a motor.loop(): sólo los sprites que están en la
+    vista, ampliada margen pixeles por cada lado, se mueven y chocan. Los
+    demás se quedan quietos hasta que la vista se acerca. Así el costo de un
+    cuadro depende del tamaño de la pantalla y no del mapa.
+    """
+    def __init__(self, motor, tile=(32, 32), margen=64):
+        """
+        Inicializa la cámara:
+        -- motor:  Motor de PGU.
+        -- tile:   Ancho y alto de los tiles.
+        -- margen: Pixeles alrededor de la vista en los que hay actividad.
+        """
+        self.motor = motor
+        self.tw, self.th = tile
+        self.margen = margen
+        self.sprite = None
+
+    def seguir(self, sprite):
+        "Establece el sprite al que sigue la cámara."
+        self.sprite = sprite
+
+    def enfocar(self, tamano=None):
+        """Centra la vista, de tamano pixeles (por omisión el que ya tiene o
+        el de la pantalla), en el sprite seguido, dentro de los límites del
+        mapa. Si el mapa es más chico que la vista, queda en la esquina."""
+        vista = self.motor.view
+        if tamano is None:
+            tamano = vista.size
+        if not tamano[0] or not tamano[1]:
+            tamano = p.display.get_surface().get_size()
+        vista.size = tamano
+        if self.sprite is not None:
+            vista.center = self.sprite.rect.center
+            ancho, alto = self.motor.size
+            vista.x = max(min(vista.x, ancho * self.tw - vista.w), 0)
+            vista.y = max(min(vista.y, alto * self.th - vista.h), 0)
+
+    def activa(self):
+        "Área del mapa, en pixeles, en la que los sprites se actualizan."
+        return self.motor.view.inflate(2 * self.margen, 2 * self.margen)
+
+    def actualizar(self):
+        """Enfoca al sprite seguido y ejecuta motor.loop() sólo con los
+        sprites del área activa. Los que el ciclo quite o agregue se
+        respetan."""
+        self.enfocar()
+        sprites = self.motor.sprites
+        area = self.activa()
+        quietos = [sprite for sprite in sprites
+                   if not area.colliderect(sprite.rect)]
+        if not quietos:
+            self.motor.loop()
+            return
+        sprites[:] = [sprite for sprite in sprites
+                      if area.colliderect(sprite.rect)]
+        try:
+            self.motor.loop()
+        finally:
+            sprites.extend(quietos)
@@ -4,19 +4,52 @@
 """Funciones y variables comunes para los videojuegos."""
 
 import os
-import pygame as p
+import numpy
+from pgu.vid import Tile
+from pyjuego.recursos import recursos
  
 def cargar_imagen(nombre, alpha= False, dirs= "imagenes"):
-    "Cargar imágenes del juego."
-    ruta = os.path.join(dirs, nombre)
-    try:
-        imagen = p.image.load(ruta)
-    except:
-        print("No se puede cargar la imagen: ", ruta)
-        raise
-        
-    if alpha == True:
-        imagen = imagen.convert_alpha()
-    else:
-        imagen = imagen.convert()
-    return imagen
+    """Cargar imágenes del juego. Vienen de la caché de recursos, así que no
+    se deben modificar."""
+    return recursos.imagen(os.path.join(dirs, nombre), alpha)
+
+def cargar_tiles(motor, ruta, tamano, tdata=None):
+    """Como tga_load_tiles de PGU, pero con la imagen de la caché de recursos.
+    Los tiles son del motor; sólo se comparten sus imágenes."""
+    tw, th = tamano
+    imagen = recursos.imagen(ruta, True)
+    ancho, alto = imagen.get_size()
+    n = 0
+    for y in range(0, alto, th):
+        for x in range(0, ancho, tw):
+            tile = Tile(imagen.subsurface((x, y, tw, th)))
+            motor.tiles[n] = tile
+            if tdata and n in tdata:
+                agrupos, golpe, config = tdata[n]
+                tile.agroups = motor.string2groups(agrupos)
+                tile.hit = golpe
+                tile.config = config
+            n += 1
+
+def cargar_sprites(motor, imagenes):
+    """Como load_images de PGU, con las imágenes (nombre, ruta, forma) de la
+    caché de recursos."""
+    for nombre, ruta, forma in imagenes:
+        motor.images[nombre] = recursos.imagen(ruta, True), forma
+
+def cargar_nivel(motor, mapa, codigos=None, bg=0):
+    """Cargar un mapa (arreglo de NumPy de filas x columnas) en un motor de
+    PGU. Cada valor del mapa es el tile de su casilla, salvo los que están en
+    codigos ({valor: código}), que dejan el tile 0 y ponen su código en la
+    capa de códigos. Las capas se calculan con máscaras y se copian fila a
+    fila a las listas del motor."""
+    alto, ancho = mapa.shape
+    motor.resize((ancho, alto), bg)
+    tiles = numpy.array(mapa, dtype=int)
+    codigo = numpy.zeros_like(tiles)
+    for valor, cod in (codigos or {}).items():
+        mascara = mapa == valor
+        tiles[mascara] = 0
+        codigo[mascara] = cod
+    motor.tlayer[:] = tiles.tolist()
+    motor.clayer[:] = codigo.tolist()
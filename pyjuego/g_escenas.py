@@ -6,48 +6,209 @@ Módulo para gestión de escenas en Pygame. Está conformado por las clases Esce
 y Director.
 """
 
+import os
+import time
 import pygame as p
+from pyjuego.perfil import perfil
+
+ATRASO_MAXIMO = 250 #Milisegundos de simulación que se recuperan como mucho.
+ARCHIVO_PERFIL = 'perfil.csv'   #Donde F4 guarda el perfil de los cuadros.
+
+_pulsadas = None    #Teclas del guion de Director.simular(); None fuera de él.
+
+class Teclado(frozenset):
+    "Conjunto de teclas pulsadas que se consulta como p.key.get_pressed()."
+    def __getitem__(self, tecla):
+        return tecla in self
+
+def teclas_pulsadas():
+    """Estado de las teclas, como p.key.get_pressed(). Durante
+    Director.simular() son las del guion en lugar de las del teclado."""
+    if _pulsadas is None:
+        return p.key.get_pressed()
+    return _pulsadas
+
+def unir_rects(rects):
+    "Une los rectángulos que se solapan, para actualizar cada área una vez."
+    unidos = []
+    for rect in rects:
+        rect = p.Rect(rect)
+        i = rect.collidelist(unidos)
+        while i != -1:
+            rect.union_ip(unidos.pop(i))
+            i = rect.collidelist(unidos)
+        unidos.append(rect)
+    return unidos
 
 class Director():
     """Es el objeto principal del videojuego y se encarga de gestionar escenas y
     ejecutar el juego."""
-    def __init__(self, titulo="", res=(640, 480)):
-        "Inicializar Pygame, la pantalla, y el reloj."
+    def __init__(self, titulo="", res=(640, 480), sin_ventana=False):
+        """Inicializar Pygame, la pantalla, y el reloj. sin_ventana usa el
+        controlador de video nulo de SDL, para simular() sin pantalla."""
+        if sin_ventana:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
         p.init()
         self.pantalla = p.display.set_mode(res)
         p.display.set_caption(titulo)
         self.escena = None
         self.reloj = p.time.Clock()
         self.res = res
+        self.perfil = perfil
         
-    def ejecutar(self, escena_inicial, fps = 60):
-        "Ejecuta el ciclo principal del videojuego."
+    def ejecutar(self, escena_inicial, fps = 60, espera = 500,
+                 fps_dibujo = 0, perfilar = False):
+        """Ejecuta el ciclo principal del videojuego. La escena se actualiza
+        fps veces por segundo de tiempo real, con un paso fijo, y se dibuja
+        tan seguido como permita la pantalla, o como mucho fps_dibujo veces
+        por segundo si no es 0; en escena.alfa queda la fracción de paso
+        transcurrida desde la última actualización, para interpolar al
+        dibujar.
+        Si la escena devuelve de dibujar() la lista de rectángulos que
+        cambiaron, sólo se actualizan esos; si devuelve None se actualiza
+        toda la pantalla.
+        Mientras la escena esté inactiva no se avanza a fps cuadros por
+        segundo, sino que se espera a un evento, como mucho espera
+        milisegundos, y se actualiza una vez.
+        F3 muestra u oculta el perfil de los cuadros, F5 empieza o deja de
+        grabarlo sin mostrarlo, lo mismo que perfilar desde el inicio, y F4
+        lo guarda en ARCHIVO_PERFIL. El dibujo de la capa del perfil no se
+        cuenta en sus fases."""
+        if perfilar:
+            self.perfil.grabando = True
         self.escena = escena_inicial
+        dibujada = None     #Escena dibujada en el cuadro anterior.
+        paso = 1000.0 / fps #Milisegundos por actualización.
+        acumulado = 0.0     #Tiempo real aún no simulado.
         jugando = True      #Bandera para indicar la salida.
         while jugando:
-            self.reloj.tick(fps)
+            if self.escena.inactiva and self.escena is dibujada:
+                evento = p.event.wait(espera)
+                eventos = p.event.get()
+                if evento.type != p.NOEVENT:
+                    eventos.insert(0, evento)
+                #Que el reloj no cuente la espera al volver a animar.
+                self.reloj.tick()
+                acumulado = paso
+            else:
+                #Tras una pausa larga no se intenta recuperar todo el atraso.
+                acumulado += min(self.reloj.tick(fps_dibujo), ATRASO_MAXIMO)
+                eventos = p.event.get()
+            medir = self.perfil.activo
+            if medir:
+                self.perfil.empezar()
             #Leyendo los eventos para marcar la salida.
-            eventos = p.event.get()
             for evento in eventos:
                 if evento.type == p.QUIT:
                     jugando = False
                 elif evento.type == p.KEYDOWN:
                     if evento.key == p.K_ESCAPE:
                         jugando = False
+                    elif evento.key == p.K_F3:
+                        self.perfil.alternar()
+                        #Sin la capa del perfil, la escena se redibuja toda.
+                        self.escena.invalidar()
+                        dibujada = None
+                    elif evento.key == p.K_F4:
+                        self.perfil.guardar(ARCHIVO_PERFIL)
+                    elif evento.key == p.K_F5:
+                        self.perfil.alternar_grabacion()
             #Interacción con la escena.
-            self.escena.leer_eventos(eventos)
-            self.escena.actualizar()
-            self.escena.dibujar(self.pantalla)
+            escena = self.escena
+            escena.leer_eventos(eventos)
+            if medir:
+                self.perfil.marcar('eventos')
+            #Pasos fijos; se detienen si la escena cambia.
+            while acumulado >= paso and escena.escena is escena:
+                escena.actualizar()
+                acumulado -= paso
+            if medir:
+                self.perfil.marcar('actualizar')
+            escena.alfa = min(acumulado / paso, 1.0)
+            rects = escena.dibujar(self.pantalla)
+            if medir:
+                self.perfil.marcar('dibujar')
+            #El primer cuadro de una escena siempre se muestra completo.
+            if self.escena is not dibujada:
+                rects = None
+            if self.perfil.visible:
+                capa = self.perfil.dibujar(self.pantalla)
+                if rects is not None:
+                    rects.append(capa)
+                #La escena restaura la capa en el próximo cuadro, para que
+                #no se acumule sobre sí misma.
+                if escena.sucios is not None:
+                    escena.sucios.append(capa)
+                if medir:
+                    self.perfil.saltar()
+            dibujada = self.escena
             #Cambio de escena, en caso de que haya alguno.
             self.escena = self.escena.escena
             #Comando necesario para reflejar cambios en la pantalla.
-            p.display.flip()
+            if rects is None:
+                p.display.flip()
+            elif rects:
+                p.display.update(unir_rects(rects))
+            if medir:
+                self.perfil.marcar('mostrar')
+                self.perfil.terminar()
+            if self.escena is not dibujada:
+                #El tiempo de construir la nueva escena no se simula.
+                self.reloj.tick()
+                acumulado = 0.0
+
+
+    def simular(self, escena_inicial, cuadros, guion=None):
+        """Ejecuta el juego sin dibujar ni esperar al reloj, tan rápido como se
+        pueda, durante cuadros actualizaciones como mucho. guion(cuadro,
+        escena) devuelve las teclas pulsadas en cada cuadro, que la escena ve
+        con teclas_pulsadas() y como eventos KEYDOWN y KEYUP al cambiar.
+        Termina antes con un evento QUIT o la tecla ESC. Devuelve el número de
+        cuadros simulados, los segundos que tardaron y los cuadros por
+        segundo."""
+        global _pulsadas
+        self.escena = escena_inicial
+        anteriores = Teclado()
+        simulados = 0
+        inicio = time.perf_counter()
+        try:
+            while simulados < cuadros:
+                pulsadas = Teclado(guion(simulados, self.escena) if guion
+                                   else ())
+                eventos = p.event.get()
+                eventos += [p.event.Event(p.KEYDOWN, key=tecla, mod=0,
+                                          unicode="", scancode=0)
+                            for tecla in pulsadas - anteriores]
+                eventos += [p.event.Event(p.KEYUP, key=tecla, mod=0,
+                                          unicode="", scancode=0)
+                            for tecla in anteriores - pulsadas]
+                anteriores = _pulsadas = pulsadas
+                if any(evento.type == p.QUIT or (evento.type == p.KEYDOWN and
+                       evento.key == p.K_ESCAPE) for evento in eventos):
+                    break
+                self.escena.leer_eventos(eventos)
+                if self.escena.escena is self.escena:
+                    self.escena.actualizar()
+                self.escena = self.escena.escena
+                simulados += 1
+        finally:
+            _pulsadas = None
+        segundos = time.perf_counter() - inicio
+        return simulados, segundos, simulados / segundos if segundos else 0.0
 
 
 class Escena:
-    "Esqueleto para cada una de las escenas del videojuego."
+    """Esqueleto para cada una de las escenas del videojuego. Las escenas que
+    sólo cambian con los eventos se declaran inactivas, y el Director espera
+    a los eventos en lugar de dibujarlas a cada cuadro."""
+    inactiva = False
+    
     def __init__(self):
         self.escena = self
+        self.capa_fija = None   #Capa fija compuesta; None para rehacerla.
+        self.base = None        #Pantalla sobre la que se compuso la primera.
+        self.sucios = None      #Áreas de la capa variable del último cuadro.
+        self.alfa = 1.0         #Fracción de paso desde la última actualización.
     
     def leer_eventos(self, eventos):
         "Lee los eventos para interactuar con los objetos."
@@ -58,8 +219,45 @@ class Escena:
         pass
     
     def dibujar(self, pantalla):
-        "Dibuja los objetos en la pantalla."
+        """Dibuja los objetos en la pantalla y devuelve los rectángulos que
+        cambiaron, o None si cambió toda. Por omisión copia la capa fija,
+        compuesta sólo la primera vez y tras invalidar(), y encima dibuja la
+        capa variable. Si la capa variable devuelve sus rectángulos, sólo se
+        restauran de la capa fija los del cuadro anterior."""
+        if self.capa_fija is None:
+            #Al rehacerla se parte de la misma pantalla que la primera vez,
+            #no de la actual, que ya tiene encima la escena.
+            if self.base is None:
+                self.base = pantalla.copy()
+            self.capa_fija = self.base.copy()
+            self.dibujar_fijo(self.capa_fija)
+            self.sucios = None
+        if self.sucios is None:
+            pantalla.blit(self.capa_fija, (0, 0))
+        else:
+            for rect in self.sucios:
+                pantalla.blit(self.capa_fija, rect, rect)
+        anteriores = self.sucios
+        self.sucios = self.dibujar_variable(pantalla)
+        if anteriores is None or self.sucios is None:
+            return None
+        return anteriores + self.sucios
+
+    def dibujar_fijo(self, superficie):
+        """Dibuja los objetos que no cambian hasta que se llame a invalidar().
+        La superficie empieza con lo que había en la pantalla antes del primer
+        cuadro de la escena."""
         pass
+
+    def dibujar_variable(self, pantalla):
+        """Dibuja los objetos que cambian en cada cuadro. Devuelve la lista de
+        rectángulos dibujados, o None para actualizar toda la pantalla."""
+        return []
+
+    def invalidar(self):
+        "Vuelve a componer la capa fija en el próximo cuadro."
+        self.capa_fija = None
+        self.sucios = None
         
     def cambiar_escena(self, escena):
         "Cambia la escena del juego."
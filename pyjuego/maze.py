@@ -1,77 +1,534 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import itertools
+
 import numpy
-from numpy.random import random_integers as rand
 
-#constants 
+#constants
 MAPA_OCUPADO = 1
 MAPA_LIBRE = 0
 MAPA_SALIDA = 4
 MAPA_INICIO = 5
 MAPA_BESTIA = 6
 
+# Quadrants of the maze, as indexed in the list given by free_cells().
+QUADRANT_NW = 0
+QUADRANT_NE = 1
+QUADRANT_SW = 2
+QUADRANT_SE = 3
 
-class Maze(object):
-    def __init__(self, width=81, height=51, complexity=.75, density=.75):
-        
-        # Only odd shapes
-        shape = ((height // 2) * 2 + 1, (width // 2) * 2 + 1)
-        # Adjust complexity and density relative to maze size
-        complexity = int(complexity * (5 * (shape[0] + shape[1])))
-        density    = int(density * (shape[0] // 2 * shape[1] // 2))
-        # Build actual maze
-        self.Z = numpy.zeros(shape, dtype=numpy.int8)
-        # Fill borders
-        self.Z[0, :] = self.Z[-1, :] = MAPA_OCUPADO
-        self.Z[:, 0] = self.Z[:, -1] = MAPA_OCUPADO
-        # Make isles
-        for i in range(density):
-            x, y = rand(0, shape[1] // 2) * 2, rand(0, shape[0] // 2) * 2
-            self.Z[y, x] = MAPA_OCUPADO
-            for j in range(complexity):
-                neighbours = []
-                if x > 1:             neighbours.append((y, x - 2))
-                if x < shape[1] - 2:  neighbours.append((y, x + 2))
-                if y > 1:             neighbours.append((y - 2, x))
-                if y < shape[0] - 2:  neighbours.append((y + 2, x))
-                if len(neighbours):
-                    y_,x_ = neighbours[rand(0, len(neighbours) - 1)]
-                    if self.Z[y_, x_] == MAPA_LIBRE:
-                        self.Z[y_, x_] = MAPA_OCUPADO
-                        self.Z[y_ + (y - y_) // 2, x_ + (x - x_) // 2] = MAPA_OCUPADO
-                        x, y = x_, y_
-
-        
-        # define an exit in empty cell
+# Steps of a walk towards west, east, north and south, in grid cells.
+_DX = numpy.array([-2, 2, 0, 0])
+_DY = numpy.array([0, 0, -2, 2])
+# Walkers that cannot move any more are dropped every this many steps.
+_PODA = 8
+
+
+def carve_isles(Z, complexity, density, rng):
+    """Grow `density` isles of walls on Z, each `complexity` steps long.
+
+    The walks are launched in waves of doubling size and every wave advances
+    all of its walks at the same time as array operations. The first isles of
+    the original loop are the ones that shape the maze (the later ones mostly
+    start on a wall and get stuck), so small early waves keep the same
+    statistics. When several walkers want the same free cell on one step only
+    the first one takes it, the rest try again on the next step, just like a
+    single walker that hits a wall.
+    """
+    lanzados, ola = 0, 1
+    while lanzados < density:
+        ola = min(ola, density - lanzados)
+        _walk(Z, complexity, ola, rng)
+        lanzados += ola
+        ola *= 2
+    return Z
+
+
+def _walk(Z, complexity, n, rng):
+    "Advance n isle walks started at random posts of Z."
+    height, width = Z.shape
+    x = rng.integers(0, width // 2 + 1, n) * 2
+    y = rng.integers(0, height // 2 + 1, n) * 2
+    Z[y, x] = MAPA_OCUPADO
+    for j in range(complexity):
+        if j % _PODA == 0:
+            # A walker surrounded by walls is stuck for good: walls are
+            # never removed.
+            libre = numpy.zeros(len(x), dtype=bool)
+            for dx, dy in zip(_DX, _DY):
+                x_, y_ = x + dx, y + dy
+                dentro = (x_ > 0) & (x_ < width) & (y_ > 0) & (y_ < height)
+                libre[dentro] |= Z[y_[dentro], x_[dentro]] == MAPA_LIBRE
+            x, y = x[libre], y[libre]
+            if not len(x):
+                return
+        valid = numpy.stack(
+            (x > 1, x < width - 2, y > 1, y < height - 2), axis=1)
+        count = valid.sum(axis=1)
+        k = (rng.random(len(x)) * count).astype(numpy.intp)
+        choice = (numpy.cumsum(valid, axis=1) > k[:, None]).argmax(axis=1)
+        x_, y_ = x + _DX[choice], y + _DY[choice]
+        mover = numpy.flatnonzero(
+            (count > 0) & (Z[y_, x_] == MAPA_LIBRE))
+        if not len(mover):
+            continue
+        destino = y_[mover] * width + x_[mover]
+        mover = mover[numpy.unique(destino, return_index=True)[1]]
+        x_, y_ = x_[mover], y_[mover]
+        Z[y_, x_] = MAPA_OCUPADO
+        Z[(y[mover] + y_) // 2, (x[mover] + x_) // 2] = MAPA_OCUPADO
+        x[mover], y[mover] = x_, y_
+
+
+
+def isles(shape, complexity, density, rng):
+    """Density/complexity isle maze: walls grown as random walks from the
+    border inwards. Not a perfect maze, it may have loops and closed pockets.
+    """
+    # Adjust complexity and density relative to maze size
+    complexity = int(complexity * (5 * (shape[0] + shape[1])))
+    density    = int(density * (shape[0] // 2 * shape[1] // 2))
+    # Build actual maze
+    Z = numpy.zeros(shape, dtype=numpy.int8)
+    # Fill borders
+    Z[0, :] = Z[-1, :] = MAPA_OCUPADO
+    Z[:, 0] = Z[:, -1] = MAPA_OCUPADO
+    # Make isles
+    return carve_isles(Z, complexity, density, rng)
+
+
+# The perfect maze generators below work on a grid of h x w cells, the odd
+# positions of Z. Passages are stored in two boolean arrays: east[r, c] opens
+# the wall between cells (r, c) and (r, c + 1), south[r, c] the one between
+# (r, c) and (r + 1, c). complexity and density are ignored.
+
+def _carve(shape, east, south):
+    "Build the MAPA_* array of a cell grid from its open passages."
+    Z = numpy.full(shape, MAPA_OCUPADO, dtype=numpy.int8)
+    Z[1::2, 1::2] = MAPA_LIBRE
+    Z[1:-1:2, 2:-1:2][east] = MAPA_LIBRE
+    Z[2:-1:2, 1:-1:2][south] = MAPA_LIBRE
+    return Z
+
+
+def _edges(h, w):
+    "Passages of a full h x w grid as flat cell indices: east ones first."
+    cells = numpy.arange(h * w).reshape(h, w)
+    u = numpy.concatenate((cells[:, :-1].ravel(), cells[:-1, :].ravel()))
+    v = numpy.concatenate((cells[:, 1:].ravel(), cells[1:, :].ravel()))
+    return u, v
+
+
+def _open(shape, edges):
+    "Build Z from a boolean mask over the passages listed by _edges()."
+    h, w = shape[0] // 2, shape[1] // 2
+    n = h * (w - 1)
+    return _carve(shape, edges[:n].reshape(h, w - 1),
+                  edges[n:].reshape(h - 1, w))
+
+
+def backtracker(shape, complexity, density, rng):
+    """Iterative recursive backtracker (randomized depth first search).
+
+    Long winding corridors and few dead ends. Every cell gets one random
+    permutation of the four directions, drawn in bulk, and the search walks
+    it once: that is the same as picking a random unvisited neighbour each
+    time the cell is on top of the stack.
+    """
+    h, w = shape[0] // 2, shape[1] // 2
+    n = h * w
+    # Directions: 0 west, 1 east, 2 north, 3 south.
+    orders = list(itertools.permutations(range(4)))
+    order = rng.integers(0, len(orders), n).tolist()
+    east = bytearray(n)
+    south = bytearray(n)
+    visited = bytearray(n)
+    tried = bytearray(n)
+    start = int(rng.integers(n))
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        c = stack[-1]
+        k = tried[c]
+        if k == 4:
+            stack.pop()
+            continue
+        tried[c] = k + 1
+        d = orders[order[c]][k]
+        if d == 0:
+            if c % w == 0:
+                continue
+            m = c - 1
+            if visited[m]:
+                continue
+            east[m] = 1
+        elif d == 1:
+            m = c + 1
+            if m % w == 0 or visited[m]:
+                continue
+            east[c] = 1
+        elif d == 2:
+            m = c - w
+            if m < 0 or visited[m]:
+                continue
+            south[m] = 1
+        else:
+            m = c + w
+            if m >= n or visited[m]:
+                continue
+            south[c] = 1
+        visited[m] = 1
+        stack.append(m)
+    east = numpy.frombuffer(east, dtype=bool).reshape(h, w)
+    south = numpy.frombuffer(south, dtype=bool).reshape(h, w)
+    return _carve(shape, east[:, :-1], south[:-1, :])
+
+
+def kruskal(shape, complexity, density, rng):
+    """Randomized Kruskal over an array-backed union-find.
+
+    Passages get a random order and each one is opened when it joins two
+    different sets. Instead of walking the order one passage at a time,
+    every set takes its first passage to another set in one array pass
+    (Boruvka rounds) and the union-find parent array is compressed by pointer
+    jumping. For distinct weights that picks exactly the tree Kruskal would,
+    in a logarithmic number of rounds.
+    """
+    h, w = shape[0] // 2, shape[1] // 2
+    n = h * w
+    u, v = _edges(h, w)
+    opened = numpy.zeros(len(u), dtype=bool)
+    # Position in the shuffled list is the weight of the passage.
+    ids = rng.permutation(len(u))
+    u, v = u[ids], v[ids]
+    parent = numpy.arange(n)
+    while len(ids):
+        ru, rv = parent[u], parent[v]
+        keep = ru != rv
+        ids, u, v, ru, rv = ids[keep], u[keep], v[keep], ru[keep], rv[keep]
+        if not len(ids):
+            break
+        first = numpy.full(n, len(ids))
+        pos = numpy.arange(len(ids))
+        numpy.minimum.at(first, ru, pos)
+        numpy.minimum.at(first, rv, pos)
+        sets = numpy.flatnonzero(first < len(ids))
+        e = first[sets]
+        other = numpy.where(ru[e] == sets, rv[e], ru[e])
+        parent[sets] = other
+        # Two sets that chose the same passage point at each other.
+        mutual = (parent[other] == sets) & (sets < other)
+        parent[sets[mutual]] = sets[mutual]
+        opened[ids[e]] = True
         while True:
-            x, y = rand(0,width//2), rand(0,height//2)
-            #print ">" + str(self.Z[x,y])
-            if self.Z[x,y] == MAPA_LIBRE:
-                self.Z[x,y] = MAPA_SALIDA
+            jump = parent[parent]
+            if numpy.array_equal(jump, parent):
                 break
-        
-        # define a start in empty cell
+            parent = jump
+    return _open(shape, opened)
+
+
+def wilson(shape, complexity, density, rng):
+    """Wilson's algorithm: loop-erased random walks.
+
+    Uniform spanning tree, so no bias towards long corridors or short dead
+    ends. The walks take time to find the tree at first, so it is the
+    slowest of the generators on big grids.
+    """
+    h, w = shape[0] // 2, shape[1] // 2
+    n = h * w
+    east = bytearray(n)
+    south = bytearray(n)
+    tree = bytearray(n)
+    step = bytearray(n)
+    tree[int(rng.integers(n))] = 1
+    dirs = []
+    for start in rng.permutation(n).tolist():
+        if tree[start]:
+            continue
+        # Random walk until the tree is hit, remembering only the last way
+        # out of every cell: that erases the loops.
+        c = start
+        while not tree[c]:
+            if not dirs:
+                dirs = rng.integers(0, 4, 1 << 16).tolist()
+            d = dirs.pop()
+            if d == 0:
+                if c % w == 0:
+                    continue
+                m = c - 1
+            elif d == 1:
+                m = c + 1
+                if m % w == 0:
+                    continue
+            elif d == 2:
+                m = c - w
+                if m < 0:
+                    continue
+            else:
+                m = c + w
+                if m >= n:
+                    continue
+            step[c] = d
+            c = m
+        c = start
+        while not tree[c]:
+            tree[c] = 1
+            d = step[c]
+            if d == 0:
+                c -= 1
+                east[c] = 1
+            elif d == 1:
+                east[c] = 1
+                c += 1
+            elif d == 2:
+                c -= w
+                south[c] = 1
+            else:
+                south[c] = 1
+                c += w
+    east = numpy.frombuffer(east, dtype=bool).reshape(h, w)
+    south = numpy.frombuffer(south, dtype=bool).reshape(h, w)
+    return _carve(shape, east[:, :-1], south[:-1, :])
+
+
+def eller(shape, complexity, density, rng):
+    """Eller's algorithm, one row at a time.
+
+    Only the sets of the current row are kept, so memory is linear in the
+    width. Joins inside the row use a small union-find, the passages to the
+    next row are drawn as arrays.
+    """
+    h, w = shape[0] // 2, shape[1] // 2
+    east = numpy.zeros((h, max(w - 1, 0)), dtype=bool)
+    south = numpy.zeros((max(h - 1, 0), w), dtype=bool)
+    sets = numpy.arange(w)
+    for r in range(h):
+        last = r == h - 1
+        labels = sets.tolist()
+        parent = list(range(w))
+        if last:
+            join = [True] * (w - 1)
+        else:
+            join = (rng.random(w - 1) < .5).tolist()
+        row = east[r]
+        for c in range(w - 1):
+            if not join[c]:
+                continue
+            a = labels[c]
+            while parent[a] != a:
+                a = parent[a]
+            b = labels[c + 1]
+            while parent[b] != b:
+                b = parent[b]
+            if a != b:
+                # Lower root wins so the trees stay shallow left to right.
+                if a < b:
+                    parent[b] = a
+                else:
+                    parent[a] = b
+                row[c] = True
+        if last:
+            break
+        parent = numpy.array(parent)
         while True:
-            x, y = rand(width//2,width), rand(height//2,height)
-            #print ">" + str(self.Z[x,y])
-            if self.Z[x,y] == MAPA_LIBRE:
-                self.Z[x,y] = MAPA_INICIO
+            jump = parent[parent]
+            if numpy.array_equal(jump, parent):
                 break
-        
-        # define enemy cell
-        while True:
-            x, y = rand(width//2,width), rand(0 ,height//2)
-            #print ">" + str(self.Z[x,y])
-            if self.Z[x,y] == MAPA_LIBRE:
-                self.Z[x,y] = MAPA_BESTIA
+            parent = jump
+        roots = parent[sets]
+        # Random passages down, at least one per set: the cell with the
+        # highest draw of every set always goes down.
+        draw = rng.random(w)
+        down = draw < .5
+        order = numpy.lexsort((draw, roots))
+        ends = numpy.r_[roots[order][1:] != roots[order][:-1], True]
+        down[order[ends]] = True
+        south[r] = down
+        # Cells that go down keep their set, the others start a new one.
+        nuevos = numpy.where(down, roots, w + numpy.arange(w))
+        sets = numpy.unique(nuevos, return_inverse=True)[1].ravel()
+    return _carve(shape, east, south)
+
+
+# Maze generators by name. Each one takes the odd (height, width) shape, the
+# complexity and density of the level and a numpy.random.Generator, and
+# returns the MAPA_OCUPADO / MAPA_LIBRE int8 array with a closed border.
+GENERATORS = {
+    'isles': isles,
+    'backtracker': backtracker,
+    'kruskal': kruskal,
+    'wilson': wilson,
+    'eller': eller,
+}
+
+
+# Random streams of a level, all derived from its seed.
+STREAM_CARVING = 0
+STREAM_PLACEMENT = 1
+STREAM_ENEMIES = 2
+STREAM_LEVELS = 3
+# Used by the chunks of pyjuego.maze_infinite.
+STREAM_CHUNKS = 4
+STREAM_DOORS = 5
+
+
+def new_seed():
+    "A fresh random seed for a level."
+    return numpy.random.SeedSequence().entropy
+
+
+def stream(seed, *path):
+    """numpy.random.Generator of the stream `path` of seed, e.g.
+    stream(seed, STREAM_ENEMIES, 2) for the third enemy. Different paths give
+    independent streams and the same path always gives the same numbers."""
+    return numpy.random.default_rng(
+        numpy.random.SeedSequence(seed, spawn_key=path))
+
+
+def next_seed(seed):
+    "Seed of the level that follows the one of seed."
+    return int(numpy.random.SeedSequence(
+        seed, spawn_key=(STREAM_LEVELS,)).generate_state(1, numpy.uint64)[0])
+
+
+class PlacementError(ValueError):
+    "There is no free cell where a marker has to be placed."
+
+
+def free_cells(Z):
+    """Flat indices of the MAPA_LIBRE cells of Z, split by quadrant.
+
+    Returns four arrays, in QUADRANT_* order. The middle row and column
+    belong to the bottom and right quadrants.
+    """
+    cells = numpy.flatnonzero(Z == MAPA_LIBRE)
+    y, x = numpy.divmod(cells, Z.shape[1])
+    quadrant = (y >= Z.shape[0] // 2) * 2 + (x >= Z.shape[1] // 2)
+    # cells is sorted, a stable sort keeps every quadrant sorted too.
+    order = numpy.argsort(quadrant, kind='stable')
+    bounds = numpy.searchsorted(quadrant[order], [1, 2, 3])
+    return numpy.split(cells[order], bounds)
+
+
+def distance_field(Z, start):
+    """Path length from start, a (row, column) of Z, to every cell.
+
+    Breadth first search done as a frontier expansion: each step moves the
+    whole frontier one cell with array operations. Walls and cells that
+    cannot be reached get -1. The result has the smallest signed dtype that
+    holds the longest path, to keep cached mazes small. Z must have a closed
+    border, as the GENERATORS give it.
+    """
+    width = Z.shape[1]
+    passable = (Z != MAPA_OCUPADO).ravel()
+    distances = numpy.full(Z.size, -1, dtype=numpy.int32)
+    frontier = numpy.array([start[0] * width + start[1]])
+    distances[frontier] = 0
+    steps = numpy.array([-1, 1, -width, width])
+    d = 0
+    while len(frontier):
+        d += 1
+        frontier = (frontier[:, None] + steps).ravel()
+        frontier = numpy.unique(
+            frontier[passable[frontier] & (distances[frontier] < 0)])
+        distances[frontier] = d
+    # The smallest signed type down to -d - 1 also goes up to d.
+    dtype = numpy.min_scalar_type(-d - 1)
+    return distances.astype(dtype).reshape(Z.shape)
+
+
+class Maze(object):
+    # MazeCache (see pyjuego.maze_cache) consulted for seeded mazes, if set.
+    cache = None
+
+    def __init__(self, width=81, height=51, complexity=.75, density=.75,
+                 rng=None, algorithm='isles', distance=.75, attempts=10,
+                 seed=None):
+        """Generate a maze with its markers.
+
+        The exit is put at `distance` times the longest path from the start
+        and the enemy in the top right quadrant, both reachable from the
+        start. Layouts where that is not possible, or where the start sees
+        less than half of the free cells, are generated again up to
+        `attempts` times before PlacementError is raised.
+
+        Random numbers come from rng or, if it is not given, from the
+        STREAM_CARVING and STREAM_PLACEMENT streams of seed (a new one if it
+        is None), kept in self.seed. Mazes with a seed and no rng are looked
+        up in and saved to Maze.cache.
+        """
+        if algorithm not in GENERATORS:
+            raise ValueError("Unknown maze algorithm %r, use one of: %s"
+                             % (algorithm, ", ".join(sorted(GENERATORS))))
+        self.algorithm = algorithm
+        key = None
+        if rng is None:
+            if seed is not None and Maze.cache is not None:
+                key = (algorithm, seed, width, height, complexity, density,
+                       distance)
+                cached = Maze.cache.load(key)
+                if cached is not None:
+                    self.seed = seed
+                    self.Z, self.distances, markers = cached
+                    self.start, self.exit, self.enemy = [
+                        tuple(int(i) for i in m) for m in markers]
+                    return
+            if seed is None:
+                seed = new_seed()
+            rng = stream(seed, STREAM_CARVING)
+            placement = stream(seed, STREAM_PLACEMENT)
+        else:
+            placement = rng
+        self.seed = seed
+        # Only odd shapes
+        shape = ((height // 2) * 2 + 1, (width // 2) * 2 + 1)
+        for attempt in range(attempts):
+            self.Z = GENERATORS[algorithm](shape, complexity, density, rng)
+            try:
+                self.place_markers(placement, distance)
                 break
-            #else:
-            #    print self.Z[x,y]
-        
-        return
-     
+            except PlacementError:
+                if attempt == attempts - 1:
+                    raise
+        if key is not None:
+            Maze.cache.store(key, self.Z, self.distances,
+                             numpy.array([self.start, self.exit, self.enemy]))
+
+    def place_markers(self, rng, distance=.75):
+        """Place start, exit and enemy on Z and compute self.distances, the
+        distance_field() from the start."""
+        free = free_cells(self.Z)
+        self.start = self.place(MAPA_INICIO, free[QUADRANT_SE], rng,
+                                "in the bottom right quadrant")
+        self.distances = distance_field(self.Z, self.start)
+        reachable = self.distances.ravel() > 0
+        if reachable.sum() * 2 < sum(len(f) for f in free):
+            raise PlacementError("The start only reaches %d of %d free cells"
+                                 % (reachable.sum(),
+                                    sum(len(f) for f in free)))
+        # Exit: a free cell at least at the target distance.
+        target = max(1, int(distance * self.distances.max()))
+        far = numpy.flatnonzero((self.distances.ravel() >= target)
+                                & (self.Z.ravel() == MAPA_LIBRE))
+        self.exit = self.place(MAPA_SALIDA, far, rng,
+                               "at distance %d or more" % target)
+        # Enemy: a reachable free cell in the top right quadrant.
+        cells = free[QUADRANT_NE]
+        cells = cells[reachable[cells] & (self.Z.flat[cells] == MAPA_LIBRE)]
+        self.enemy = self.place(MAPA_BESTIA, cells, rng,
+                                "reachable in the top right quadrant")
+
+    def place(self, marker, cells, rng, where="available"):
+        """Put marker on one of cells, flat indices of Z, chosen at random.
+        Returns its (row, column)."""
+        if not len(cells):
+            raise PlacementError("No free cell %s for marker %d"
+                                 % (where, marker))
+        cell = int(cells[rng.integers(len(cells))])
+        self.Z.flat[cell] = marker
+        return divmod(cell, self.Z.shape[1])
+
     def getMap(self):
         return self.Z
-
-        
\ No newline at end of file
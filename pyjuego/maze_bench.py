@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the maze generators. It does not need pygame:
+
+    python -m pyjuego.maze_bench --output baseline.json
+    python -m pyjuego.maze_bench --compare baseline.json
+
+Every generator in GENERATORS builds full Maze objects (markers and distance
+field included) across a range of sizes. The isle generator, the only one that
+uses them, is also run for the complexity and density of several levels of
+EscenaJuego. Each run reports wall time, peak memory and cells per second and
+checks the result.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from pyjuego.maze import (GENERATORS, MAPA_BESTIA, MAPA_INICIO, MAPA_OCUPADO,
+                          MAPA_SALIDA, Maze)
+
+SIZES = (16, 64, 256, 1024, 4096)
+# (complejidad, densidad) of levels 1, 6, 11 and 19 of EscenaJuego, which
+# starts at 0.10, 0.20 and adds 0.05, 0.02 per level.
+LEVELS = tuple((round(.10 + .05 * k, 2), round(.20 + .02 * k, 2))
+               for k in (0, 5, 10, 18))
+# Slower than this many times the baseline counts as a regression.
+TOLERANCE = 1.25
+
+
+def check(maze):
+    "List of the problems of a generated maze, empty if it is valid."
+    Z = maze.getMap()
+    problems = []
+    if Z.dtype != numpy.int8:
+        problems.append("dtype %s" % Z.dtype)
+    if Z.shape[0] % 2 == 0 or Z.shape[1] % 2 == 0:
+        problems.append("even shape %s" % (Z.shape,))
+    border = numpy.concatenate((Z[0], Z[-1], Z[:, 0], Z[:, -1]))
+    if (border != MAPA_OCUPADO).any():
+        problems.append("open border")
+    for marker in (MAPA_SALIDA, MAPA_INICIO, MAPA_BESTIA):
+        count = numpy.count_nonzero(Z == marker)
+        if count != 1:
+            problems.append("%d cells with marker %d" % (count, marker))
+    return problems
+
+
+def run(algorithm, size, complexity, density, repeat=1, seed=0):
+    "Benchmark one case, returns its result dictionary."
+    # Never served from a cache.
+    cache, Maze.cache = Maze.cache, None
+    try:
+        times = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            maze = Maze(size, size, complexity, density, algorithm=algorithm,
+                        seed=seed + i)
+            times.append(time.perf_counter() - start)
+        # Memory is measured apart, tracemalloc slows the Python code down.
+        tracemalloc.start()
+        try:
+            Maze(size, size, complexity, density, algorithm=algorithm,
+                 seed=seed)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        Maze.cache = cache
+    best = min(times)
+    cells = maze.getMap().size
+    return {
+        'algorithm': algorithm,
+        'size': size,
+        'complexity': complexity,
+        'density': density,
+        'seconds': best,
+        'peak_bytes': peak,
+        'cells_per_second': cells / best if best else float('inf'),
+        'problems': check(maze),
+    }
+
+
+def cases(algorithms, sizes):
+    "(algorithm, size, complexity, density) of every case to run."
+    for algorithm in algorithms:
+        levels = LEVELS if algorithm == 'isles' else LEVELS[:1]
+        for size in sizes:
+            for complexity, density in levels:
+                yield algorithm, size, complexity, density
+
+
+def case_key(result):
+    "Key that matches a result with the same case in a baseline."
+    return (result['algorithm'], result['size'], result['complexity'],
+            result['density'])
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    "Print the time ratio against baseline, returns the regressed cases."
+    old = dict((case_key(r), r) for r in baseline['results'])
+    regressions = []
+    for result in results:
+        before = old.get(case_key(result))
+        if before is None:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        flag = ""
+        if ratio > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(result)
+        print("%-12s %5d  c=%.2f d=%.2f  %8.4fs -> %8.4fs  x%.2f%s" % (
+            case_key(result) + (before['seconds'], result['seconds'], ratio,
+                                flag)))
+    return regressions
+
+
+def main(argv=None):
+    "Command line entry point."
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--algorithms', nargs='+', default=sorted(GENERATORS),
+                        choices=sorted(GENERATORS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per case, the best time is kept")
+    parser.add_argument('--output', help="write the results as JSON here")
+    parser.add_argument('--compare', help="JSON baseline to compare with")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = []
+    for algorithm, size, complexity, density in cases(args.algorithms,
+                                                      args.sizes):
+        repeat = args.repeat if size <= 1024 else 1
+        result = run(algorithm, size, complexity, density, repeat)
+        results.append(result)
+        print("%-12s %5d  c=%.2f d=%.2f  %8.4fs  %9.1f MB  %12.0f cells/s"
+              "  %s" % (algorithm, size, complexity, density,
+                        result['seconds'], result['peak_bytes'] / 2. ** 20,
+                        result['cells_per_second'],
+                        "; ".join(result['problems']) or "ok"))
+        sys.stdout.flush()
+
+    status = 0
+    if any(result['problems'] for result in results):
+        status = 1
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'numpy': numpy.__version__,
+                'machine': platform.machine(),
+                'results': results,
+            }, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+On disk cache of generated mazes, so that seeded levels are not generated again.
+"""
+
+import hashlib
+import os
+
+import numpy
+
+# Arrays saved for every maze, one .npy file each.
+_PARTS = ('Z', 'distances', 'markers')
+
+
+class MazeCache(object):
+    """Directory of .npy files with the arrays of generated mazes.
+
+    Entries are found by a key tuple, (algorithm, seed, width, height,
+    complexity, density, distance) for Maze, and loaded memory-mapped in
+    copy-on-write mode: changes to the arrays stay in memory. When the files
+    take more than max_bytes, the least recently used entries are removed.
+    A maze whose arrays alone take more than max_bytes is not stored at all,
+    as it would be removed right away along with the others.
+    """
+    def __init__(self, directory, max_bytes=64 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key, part):
+        "File of one of the arrays of key."
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, "%s.%s.npy" % (name, part))
+
+    def load(self, key):
+        "Arrays stored for key, in _PARTS order, or None if there are none."
+        paths = [self.path(key, part) for part in _PARTS]
+        try:
+            arrays = [numpy.load(path, mmap_mode='c') for path in paths]
+        except (IOError, OSError, ValueError):
+            return None
+        # The modification time of the Z file marks the last use.
+        try:
+            os.utime(paths[0], None)
+        except OSError:
+            pass
+        return arrays
+
+    def store(self, key, *arrays):
+        """Save the arrays of key and evict old entries if over max_bytes.
+        Returns False, storing nothing, if the arrays do not fit in
+        max_bytes."""
+        if sum(numpy.asarray(array).nbytes for array in arrays) \
+                > self.max_bytes:
+            return False
+        for part, array in zip(_PARTS, arrays):
+            path = self.path(key, part)
+            # Written aside and renamed, so a reader never sees half a file.
+            tmp = "%s.%d.tmp" % (path, os.getpid())
+            with open(tmp, 'wb') as f:
+                numpy.save(f, array)
+            os.replace(tmp, path)
+        # Z last used now, after the other parts.
+        os.utime(self.path(key, _PARTS[0]), None)
+        self.evict()
+        return True
+
+    def entries(self):
+        "List of (last use, bytes, file prefix) of the stored mazes."
+        entries = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npy'):
+                continue
+            prefix, part = name[:-4].rsplit('.', 1)
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            used, size = entries.get(prefix, (0, 0))
+            if part == _PARTS[0]:
+                used = stat.st_mtime
+            entries[prefix] = (used, size + stat.st_size)
+        return [(used, size, prefix)
+                for prefix, (used, size) in entries.items()]
+
+    def evict(self):
+        "Remove the least recently used mazes until they fit in max_bytes."
+        entries = sorted(self.entries())
+        total = sum(size for used, size, prefix in entries)
+        for used, size, prefix in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(prefix)
+            total -= size
+
+    def clear(self):
+        "Remove every stored maze."
+        for used, size, prefix in self.entries():
+            self._remove(prefix)
+
+    def _remove(self, prefix):
+        "Delete the files of one maze."
+        for part in _PARTS:
+            try:
+                os.remove(os.path.join(self.directory,
+                                       "%s.%s.npy" % (prefix, part)))
+            except OSError:
+                pass
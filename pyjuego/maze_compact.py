@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compact maze representation for huge grids: one bit per cell for the walls and
+a side table for the few marker cells.
+"""
+
+import numpy
+
+from pyjuego.maze import MAPA_OCUPADO, MAPA_LIBRE
+
+
+class CompactMaze(object):
+    """Maze stored as a wall bitmap plus a dictionary of markers.
+
+    Walls are packed with numpy.packbits, eight cells per byte along each row,
+    so a 16384 x 16384 maze takes 32 MB instead of 256 MB. Every cell that is
+    neither MAPA_OCUPADO nor MAPA_LIBRE is kept in self.markers as
+    {(row, column): value}. Convert from and to the Maze.getMap() array with
+    from_array() and to_array().
+    """
+    def __init__(self, shape, bits, markers=None):
+        self.shape = tuple(shape)
+        self.bits = bits
+        self.markers = {} if markers is None else markers
+
+    @classmethod
+    def from_array(cls, Z):
+        "Pack a MAPA_* int8 array, such as Maze.getMap()."
+        Z = numpy.asarray(Z)
+        bits = numpy.packbits(Z == MAPA_OCUPADO, axis=1)
+        rows, cols = numpy.nonzero((Z != MAPA_OCUPADO) & (Z != MAPA_LIBRE))
+        markers = dict(zip(zip(rows.tolist(), cols.tolist()),
+                           Z[rows, cols].tolist()))
+        return cls(Z.shape, bits, markers)
+
+    def to_array(self):
+        "The full MAPA_* int8 array, the same that from_array() was given."
+        return self.region(0, 0, self.shape[1], self.shape[0])
+
+    @property
+    def nbytes(self):
+        "Bytes taken by the wall bitmap."
+        return self.bits.nbytes
+
+    def is_wall(self, x, y):
+        "True if the cell at column x, row y is a wall."
+        return bool((self.bits[y, x >> 3] >> (7 - (x & 7))) & 1)
+
+    def get(self, x, y):
+        "MAPA_* value of the cell at column x, row y."
+        if self.is_wall(x, y):
+            return MAPA_OCUPADO
+        return self.markers.get((y, x), MAPA_LIBRE)
+
+    def set(self, x, y, value):
+        "Change the MAPA_* value of the cell at column x, row y."
+        bit = 0x80 >> (x & 7)
+        if value == MAPA_OCUPADO:
+            self.bits[y, x >> 3] |= bit
+        else:
+            self.bits[y, x >> 3] &= ~bit & 0xFF
+        if value in (MAPA_OCUPADO, MAPA_LIBRE):
+            self.markers.pop((y, x), None)
+        else:
+            self.markers[(y, x)] = value
+
+    def region(self, x, y, width, height):
+        """MAPA_* int8 array of the cells from column x, row y, width by
+        height, clipped to the maze. Only the bytes of the region are
+        unpacked, so it is cheap for a viewport of a huge maze."""
+        x0, y0 = max(x, 0), max(y, 0)
+        x1 = min(x + width, self.shape[1])
+        y1 = min(y + height, self.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            return numpy.zeros((max(y1 - y0, 0), max(x1 - x0, 0)),
+                               dtype=numpy.int8)
+        packed = self.bits[y0:y1, x0 >> 3:(x1 + 7) >> 3]
+        skip = x0 & ~7
+        Z = numpy.unpackbits(packed, axis=1)[:, x0 - skip:x1 - skip]
+        Z = Z.astype(numpy.int8) * MAPA_OCUPADO
+        for (row, col), value in self.markers.items():
+            if y0 <= row < y1 and x0 <= col < x1:
+                Z[row - y0, col - x0] = value
+        return Z
+
+    def __getitem__(self, index):
+        """maze[rows, columns] with two slices (no step) gives region(),
+        with two integers the value of a cell."""
+        rows, cols = index
+        if isinstance(rows, slice) and isinstance(cols, slice):
+            if rows.step not in (None, 1) or cols.step not in (None, 1):
+                raise IndexError("CompactMaze slices do not take a step")
+            y0, y1, _ = rows.indices(self.shape[0])
+            x0, x1, _ = cols.indices(self.shape[1])
+            return self.region(x0, y0, x1 - x0, y1 - y0)
+        return self.get(cols, rows)
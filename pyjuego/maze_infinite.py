@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Endless maze generated lazily in square chunks around the player.
+"""
+
+from collections import OrderedDict
+
+import numpy
+
+from pyjuego.maze import (GENERATORS, MAPA_BESTIA, MAPA_INICIO, MAPA_LIBRE,
+                          MAPA_SALIDA, STREAM_CHUNKS,
+                          STREAM_DOORS, new_seed, stream)
+
+
+def _natural(n):
+    "Map an integer to a natural number, as SeedSequence spawn keys need."
+    return 2 * n if n >= 0 else -2 * n - 1
+
+
+class InfiniteMaze(object):
+    """Maze without borders, made of chunk x chunk cell squares.
+
+    Chunk (cx, cy) covers columns cx * chunk to (cx + 1) * chunk - 1 and the
+    same rows, and is generated from its own stream of seed, so it is always
+    the same whenever it is built again. Each chunk owns its top row and left
+    column, both walls with one door to the neighbour chunk. The door is drawn
+    from a stream of the border between the two chunks, so paths continue
+    across it.
+
+    Every chunk holds one MAPA_SALIDA treasure and, with probability
+    `enemies`, one MAPA_BESTIA. The MAPA_INICIO start is in chunk (0, 0).
+    Only the max_chunks most recently used chunks stay in memory. Changes made
+    with set() are kept apart and applied again when a chunk is rebuilt, so
+    collected treasures stay collected.
+    """
+    def __init__(self, seed=None, chunk=16, algorithm='backtracker',
+                 complexity=.75, density=.75, enemies=.25, max_chunks=16):
+        if algorithm not in GENERATORS:
+            raise ValueError("Unknown maze algorithm %r, use one of: %s"
+                             % (algorithm, ", ".join(sorted(GENERATORS))))
+        if seed is None:
+            seed = new_seed()
+        self.seed = seed
+        # Even, so that every chunk starts on a wall row and column.
+        self.size = max(2, (chunk // 2) * 2)
+        self.algorithm = algorithm
+        self.complexity = complexity
+        self.density = density
+        self.enemies = enemies
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.changes = {}   # {(cx, cy): {(row, col): value}}
+
+    def chunk_of(self, x, y):
+        "(cx, cy) of the chunk that holds column x, row y."
+        return x // self.size, y // self.size
+
+    def chunk(self, cx, cy):
+        "MAPA_* int8 array of chunk (cx, cy), built if it is not in memory."
+        Z = self.chunks.get((cx, cy))
+        if Z is None:
+            Z = self._generate(cx, cy)
+            self.chunks[(cx, cy)] = Z
+            while len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end((cx, cy))
+        return Z
+
+    def _door(self, cx, cy, side):
+        "Odd offset of the door of the west (side 0) or north (1) border."
+        rng = stream(self.seed, STREAM_DOORS, _natural(cx), _natural(cy),
+                     side)
+        return 2 * int(rng.integers(self.size // 2)) + 1
+
+    def _generate(self, cx, cy):
+        "Build chunk (cx, cy)."
+        n = self.size
+        key = (_natural(cx), _natural(cy))
+        rng = stream(self.seed, STREAM_CHUNKS, *key)
+        # A closed (n + 1) square whose last row and column belong to the
+        # east and south neighbours.
+        Z = GENERATORS[self.algorithm]((n + 1, n + 1), self.complexity,
+                                       self.density, rng)[:n, :n].copy()
+        Z[self._door(cx, cy, 0), 0] = MAPA_LIBRE
+        Z[0, self._door(cx, cy, 1)] = MAPA_LIBRE
+        # Markers on the cells at odd positions, always open.
+        cells = numpy.flatnonzero(Z[1::2, 1::2] == MAPA_LIBRE)
+        markers = [MAPA_SALIDA]
+        if (cx, cy) == (0, 0):
+            markers.append(MAPA_INICIO)
+        if rng.random() < self.enemies:
+            markers.append(MAPA_BESTIA)
+        chosen = rng.choice(cells, min(len(markers), len(cells)),
+                            replace=False)
+        for marker, cell in zip(markers, chosen):
+            row, col = divmod(int(cell), n // 2)
+            Z[2 * row + 1, 2 * col + 1] = marker
+        for (row, col), value in self.changes.get((cx, cy), {}).items():
+            Z[row, col] = value
+        return Z
+
+    def region(self, x, y, width, height):
+        "MAPA_* int8 array of the cells from column x, row y, width by height."
+        n = self.size
+        Z = numpy.empty((height, width), dtype=numpy.int8)
+        for cy in range(y // n, (y + height - 1) // n + 1):
+            top = max(y, cy * n)
+            bottom = min(y + height, (cy + 1) * n)
+            for cx in range(x // n, (x + width - 1) // n + 1):
+                left = max(x, cx * n)
+                right = min(x + width, (cx + 1) * n)
+                Z[top - y:bottom - y, left - x:right - x] = self.chunk(
+                    cx, cy)[top - cy * n:bottom - cy * n,
+                            left - cx * n:right - cx * n]
+        return Z
+
+    def get(self, x, y):
+        "MAPA_* value of the cell at column x, row y."
+        cx, cy = self.chunk_of(x, y)
+        return self.chunk(cx, cy)[y - cy * self.size, x - cx * self.size]
+
+    def set(self, x, y, value):
+        "Change the cell at column x, row y, also after its chunk is evicted."
+        cx, cy = self.chunk_of(x, y)
+        cell = (y - cy * self.size, x - cx * self.size)
+        self.changes.setdefault((cx, cy), {})[cell] = value
+        self.chunk(cx, cy)[cell] = value
+
+    def evict(self, x, y, radius=1):
+        """Drop the chunks more than radius chunks away from the one of
+        column x, row y."""
+        cx, cy = self.chunk_of(x, y)
+        for key in list(self.chunks):
+            if max(abs(key[0] - cx), abs(key[1] - cy)) > radius:
+                del self.chunks[key]
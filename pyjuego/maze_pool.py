@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Background generation of the mazes of the next levels, so that a level change
+does not wait for the generator.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from pyjuego.maze import Maze
+
+
+def _generate(key):
+    "Build the maze of a MazePool key, in the worker process."
+    width, height, complexity, density, algorithm, seed = key
+    return Maze(width, height, complexity, density, algorithm=algorithm,
+                seed=seed)
+
+
+def _start_worker(cache):
+    "Share the MazeCache of the game with a worker process."
+    Maze.cache = cache
+
+
+class MazePool(object):
+    """Worker processes that build mazes ahead of time.
+
+    Mazes are identified by MazePool.key(). Workers are started with 'spawn'
+    so they do not inherit the SDL display of the game, and use cache as
+    their Maze.cache.
+    """
+    def __init__(self, workers=1, cache=None):
+        self.workers = workers
+        self.cache = cache
+        self.executor = None
+        self.pending = {}
+
+    @staticmethod
+    def key(width, height, complexity, density, algorithm='isles', seed=None):
+        """Key of a maze. Parameters are rounded so that values accumulated
+        level after level always give the same key."""
+        return (width, height, round(complexity, 6), round(density, 6),
+                algorithm, seed)
+
+    def prefetch(self, keys):
+        """Start building the mazes of keys that are not under way yet and
+        drop the pending ones that are not in keys any more."""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                self.workers, multiprocessing.get_context('spawn'),
+                initializer=_start_worker, initargs=(self.cache,))
+        for key in list(self.pending):
+            if key not in keys:
+                self.pending.pop(key).cancel()
+        for key in keys:
+            if key not in self.pending:
+                self.pending[key] = self.executor.submit(_generate, key)
+
+    def get(self, key):
+        """Return the maze of key. It is waited for if it is still being
+        built, and built right here if it was never prefetched."""
+        future = self.pending.pop(key, None)
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception:
+                # A broken worker must not stop the level from loading.
+                pass
+        return _generate(key)
+
+    def shutdown(self):
+        "Cancel the pending mazes and stop the workers."
+        for future in self.pending.values():
+            future.cancel()
+        self.pending = {}
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
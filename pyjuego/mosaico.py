@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dibujo del mapa de un motor de PGU con un atlas de tiles y trozos del mapa ya
+compuestos.
+"""
+
+from collections import OrderedDict
+
+import pygame as p
+
+_atlas = {}     #{clave: (atlas, áreas, tw, th)}
+
+class Mosaico():
+    """Sustituye a Tilevid.paint para la capa de tiles y los sprites.
+
+    Todas las imágenes de los tiles del motor se copian a una sola superficie,
+    el atlas. El mapa se compone por trozos de trozo x trozo tiles, cada uno
+    con un solo blits desde el atlas, y se guardan. En cada cuadro se dibujan
+    los trozos visibles y los sprites con un solo blits. Un trozo sólo se
+    vuelve a componer si se cambia uno de sus tiles con set(), o todos tras
+    invalidar(), o si se descartó por ser de los menos usados cuando se
+    guardan más de maximo. Con una clave que identifique los tiles, el atlas
+    se construye una sola vez y lo comparten todos los mosaicos con la misma
+    clave, nivel tras nivel. cambios cuenta las veces que cambió el mapa, para
+    quien guarde su propia copia de lo pintado.
+    """
+    def __init__(self, motor, trozo=8, maximo=64, clave=None):
+        """Construye el atlas con los tiles ya cargados en el motor, o toma
+        el de clave si ya se construyó."""
+        self.motor = motor
+        self.trozo = trozo
+        self.maximo = maximo
+        self.trozos = OrderedDict()    #{(cx, cy): superficie}
+        self.cambios = 0
+        if clave in _atlas:
+            self.atlas, self.areas, self.tw, self.th = _atlas[clave]
+            return
+        imagenes = [(n, tile.image) for n, tile in enumerate(motor.tiles)
+                    if tile is not None and tile.image is not None]
+        self.tw, self.th = imagenes[0][1].get_size()
+        self.atlas = p.Surface((self.tw * len(imagenes), self.th),
+                               flags=p.SRCALPHA)
+        self.atlas.fill((0, 0, 0, 0))
+        self.areas = {}     #{tile: rect en el atlas}
+        for i, (n, imagen) in enumerate(imagenes):
+            #Con el atlas transparente, el máximo copia el tile tal cual.
+            self.areas[n] = self.atlas.blit(imagen, (i * self.tw, 0),
+                                            special_flags=p.BLEND_RGBA_MAX)
+        if clave is not None:
+            _atlas[clave] = self.atlas, self.areas, self.tw, self.th
+
+    def componer(self, cx, cy):
+        "Superficie con los tiles del trozo (cx, cy)."
+        ancho, alto = self.motor.size
+        capa = self.motor.tlayer
+        superficie = p.Surface((self.trozo * self.tw, self.trozo * self.th))
+        superficie = superficie.convert()
+        piezas = []
+        for y in range(cy * self.trozo, min((cy + 1) * self.trozo, alto)):
+            for x in range(cx * self.trozo, min((cx + 1) * self.trozo, ancho)):
+                area = self.areas.get(capa[y][x])
+                if area is not None:
+                    piezas.append((self.atlas,
+                                   ((x - cx * self.trozo) * self.tw,
+                                    (y - cy * self.trozo) * self.th), area))
+        superficie.blits(piezas, False)
+        return superficie
+
+    def set(self, pos, valor):
+        "Como motor.set, pero vuelve a componer el trozo del tile."
+        self.motor.set(pos, valor)
+        self.trozos.pop((pos[0] // self.trozo, pos[1] // self.trozo), None)
+        self.cambios += 1
+
+    def invalidar(self):
+        "Descarta todos los trozos, tras cambiar la capa de tiles entera."
+        self.trozos.clear()
+        self.cambios += 1
+
+    def pintar(self, pantalla):
+        """Dibuja los trozos visibles desde motor.view y encima los sprites
+        que están en la vista."""
+        self.pintar_mapa(pantalla)
+        self.pintar_sprites(pantalla)
+
+    def pintar_mapa(self, pantalla):
+        "Dibuja sólo los trozos visibles desde motor.view."
+        vista = self.motor.view
+        vista.w, vista.h = pantalla.get_size()
+        ancho, alto = self.motor.size
+        lado_x, lado_y = self.trozo * self.tw, self.trozo * self.th
+        piezas = []
+        for cy in range(max(vista.top // lado_y, 0),
+                        min((vista.bottom - 1) // lado_y,
+                            (alto - 1) // self.trozo) + 1):
+            for cx in range(max(vista.left // lado_x, 0),
+                            min((vista.right - 1) // lado_x,
+                                (ancho - 1) // self.trozo) + 1):
+                superficie = self.trozos.get((cx, cy))
+                if superficie is None:
+                    superficie = self.trozos[(cx, cy)] = self.componer(cx, cy)
+                else:
+                    self.trozos.move_to_end((cx, cy))
+                piezas.append((superficie,
+                               (cx * lado_x - vista.x, cy * lado_y - vista.y)))
+        while len(self.trozos) > self.maximo:
+            self.trozos.popitem(last=False)
+        pantalla.blits(piezas, False)
+
+    def pintar_sprites(self, pantalla):
+        """Dibuja los sprites que están en la vista y devuelve los
+        rectángulos que ocupan en la pantalla."""
+        vista = self.motor.view
+        piezas = []
+        for sprite in self.motor.sprites:
+            if not vista.colliderect(sprite.rect):
+                continue
+            piezas.append((sprite.image,
+                           (sprite.rect.x - sprite.shape.x - vista.x,
+                            sprite.rect.y - sprite.shape.y - vista.y)))
+        return pantalla.blits(piezas)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Niebla de guerra alrededor de un sprite, precalculada como una máscara alfa,
+que además oculta lo que el sprite no ve detrás de las paredes.
+"""
+
+from collections import OrderedDict
+
+import numpy
+import pygame as p
+
+#Transformaciones (xx, xy, yx, yy) de cada uno de los ocho octantes.
+_OCTANTES = (
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+)
+
+def visibles(capa, origen, radio, opacos=(1,)):
+    """Casillas visibles desde origen (x, y) con sombras proyectadas
+    (shadowcasting) por octantes. capa es una lista de filas de tiles, como
+    la tlayer de PGU, y opacos los tiles que tapan la vista; fuera de la capa
+    todo es opaco. Devuelve un arreglo booleano de (2 * radio + 1) casillas
+    de lado con origen en el centro."""
+    visible = numpy.zeros((2 * radio + 1, 2 * radio + 1), dtype=bool)
+    visible[radio, radio] = True
+    for octante in _OCTANTES:
+        _proyectar(capa, opacos, visible, origen, radio, 1, 1.0, 0.0, octante)
+    return visible
+
+def _proyectar(capa, opacos, visible, origen, radio, fila, inicio, fin,
+               octante):
+    "Recorre un octante desde fila, entre las pendientes inicio y fin."
+    if inicio < fin:
+        return
+    xx, xy, yx, yy = octante
+    cx, cy = origen
+    alto = len(capa)
+    nuevo_inicio = inicio
+    for j in range(fila, radio + 1):
+        dy = -j
+        bloqueado = False
+        for dx in range(-j, 1):
+            izquierda = (dx - 0.5) / (dy + 0.5)
+            derecha = (dx + 0.5) / (dy - 0.5)
+            if inicio < derecha:
+                continue
+            if fin > izquierda:
+                break
+            x = cx + dx * xx + dy * xy
+            y = cy + dx * yx + dy * yy
+            visible[y - cy + radio, x - cx + radio] = True
+            pared = not (0 <= y < alto and 0 <= x < len(capa[y])) \
+                    or capa[y][x] in opacos
+            if bloqueado:
+                if pared:
+                    nuevo_inicio = derecha
+                else:
+                    bloqueado = False
+                    inicio = nuevo_inicio
+            elif pared and j < radio:
+                #La pared abre una sombra; lo que queda a su lado se recorre
+                #aparte.
+                bloqueado = True
+                _proyectar(capa, opacos, visible, origen, radio, j + 1,
+                           inicio, izquierda, octante)
+                nuevo_inicio = derecha
+        if bloqueado:
+            break
+
+_mascaras = {}  #{(tamano, escala, maximo): máscara}
+
+def mascara(tamano, escala, maximo):
+    """Máscara alfa de la niebla para un área de tamano, al doble de su
+    tamaño y con el centro despejado. Se calcula una sola vez por tamaño,
+    escala y máximo, y se comparte, así que no se debe modificar."""
+    ancho, alto = tamano
+    clave = ((ancho, alto), escala, maximo)
+    superficie = _mascaras.get(clave)
+    if superficie is None:
+        x, y = numpy.ogrid[-ancho:ancho, -alto:alto]
+        alfa = numpy.minimum((x * x + y * y) / float(escala), maximo)
+        superficie = p.Surface((2 * ancho, 2 * alto), flags=p.SRCALPHA)
+        superficie.fill((0, 0, 0, 0))
+        pixeles = p.surfarray.pixels_alpha(superficie)
+        pixeles[:] = alfa.astype(numpy.uint8)
+        del pixeles     #Libera el bloqueo de la superficie.
+        _mascaras[clave] = superficie
+    return superficie
+
+class Niebla():
+    """Niebla radial que se oscurece con la distancia al sprite seguido.
+
+    La máscara se calcula una sola vez al doble del tamaño del área de
+    niebla, con el centro despejado en medio, y la comparten todas las
+    nieblas iguales. En cada cuadro se dibuja la
+    ventana de la máscara que deja el centro sobre el sprite, con un solo
+    blit.
+
+    Si se le da la capa de tiles con cargar(), encima se oscurecen las
+    casillas que el sprite no ve. La visibilidad sólo cambia cuando el sprite
+    pasa a otro tile, así que se calcula entonces y se guarda por tile; el
+    resto de los cuadros es otro blit de la superficie ya hecha.
+    """
+    def __init__(self, tamano=(480, 480), pos=(32, 32), escala=200,
+                 maximo=225, tile=(32, 32), opacos=(1,), recuerdo=64):
+        """
+        Inicializa la máscara:
+        -- tamano: Ancho y alto del área cubierta por la niebla.
+        -- pos:    Posición del área en la pantalla.
+        -- escala: La opacidad es la distancia al cuadrado entre la escala.
+        -- maximo: Opacidad máxima de la niebla.
+        -- tile:   Ancho y alto de los tiles.
+        -- opacos: Tiles que tapan la vista.
+        -- recuerdo: Número de tiles cuya visibilidad se guarda.
+        """
+        self.tamano = tamano
+        self.pos = pos
+        self.maximo = maximo
+        self.tw, self.th = tile
+        self.opacos = opacos
+        self.recuerdo = recuerdo
+        self.sprite = None
+        self.capa = None
+        self.vistas = OrderedDict()  #{tile: casillas visibles}
+        self.tile = None             #Tile de la superficie de sombras.
+        self.sombras = None
+        #Más allá del alcance la máscara ya es opaca, no hace falta ver más.
+        alcance = (maximo * escala) ** .5
+        self.radio = int(alcance // min(self.tw, self.th)) + 1
+        self.mascara = mascara(tamano, escala, maximo)
+
+    def seguir(self, sprite):
+        "Establece el sprite en torno al cual se despeja la niebla."
+        self.sprite = sprite
+
+    def cargar(self, capa):
+        """Establece la capa de tiles (lista de filas, como la tlayer de PGU)
+        que tapa la vista. Hay que volver a llamarla si las paredes de la capa
+        cambian, para olvidar la visibilidad guardada."""
+        self.capa = capa
+        self.vistas.clear()
+        self.tile = None
+
+    def visibles(self, tile):
+        "Casillas visibles desde tile, guardadas para las próximas veces."
+        vista = self.vistas.get(tile)
+        if vista is None:
+            vista = visibles(self.capa, tile, self.radio, self.opacos)
+            self.vistas[tile] = vista
+            while len(self.vistas) > self.recuerdo:
+                self.vistas.popitem(last=False)
+        else:
+            self.vistas.move_to_end(tile)
+        return vista
+
+    def sombrear(self, tile):
+        """Superficie que oscurece las casillas no visibles desde tile, a
+        partir de la casilla (x - radio, y - radio)."""
+        alfa = numpy.where(self.visibles(tile), 0, self.maximo)
+        alfa = alfa.astype(numpy.uint8).T
+        alfa = alfa.repeat(self.tw, axis=0).repeat(self.th, axis=1)
+        sombras = p.Surface(alfa.shape, flags=p.SRCALPHA)
+        sombras.fill((0, 0, 0, 0))
+        pixeles = p.surfarray.pixels_alpha(sombras)
+        pixeles[:] = alfa
+        del pixeles
+        return sombras
+
+    def dibujar(self, pantalla, vista=(0, 0)):
+        """Dibuja la niebla centrada en el sprite y devuelve el rectángulo que
+        cubre, o None si no sigue a ningún sprite. vista es la posición de la
+        vista del motor, para pasar del mapa a la pantalla."""
+        if self.sprite is None:
+            return None
+        ancho, alto = self.tamano
+        if self.capa is not None:
+            tile = (self.sprite.rect.centerx // self.tw,
+                    self.sprite.rect.centery // self.th)
+            #Equivale a tile_changed(), pero también vale para el jugador
+            #quieto y para los tiles movidos al cambiar de capa.
+            if tile != self.tile:
+                self.tile = tile
+                self.sombras = self.sombrear(tile)
+            recorte = pantalla.get_clip()
+            pantalla.set_clip(p.Rect(self.pos, self.tamano).clip(recorte))
+            pantalla.blit(self.sombras,
+                          ((tile[0] - self.radio) * self.tw - vista[0],
+                           (tile[1] - self.radio) * self.th - vista[1]))
+            pantalla.set_clip(recorte)
+        x = self.sprite.rect.centerx - vista[0] - self.pos[0]
+        y = self.sprite.rect.centery - vista[1] - self.pos[1]
+        x = min(max(x, 0), ancho)
+        y = min(max(y, 0), alto)
+        return pantalla.blit(self.mascara, self.pos,
+                             (ancho - x, alto - y, ancho, alto))
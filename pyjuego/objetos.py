@@ -5,15 +5,45 @@
 Módulo que contiene objetos para ser desplegados en la interfaz gráfica.
 """
 
+from collections import OrderedDict
+
 import pygame as p
 
+MAX_TEXTOS = 256    #Textos renderizados que se guardan.
+
+_fuentes = {}           #{(fuente, tamano): p.font.Font}
+_textos = OrderedDict() #{(cadena, fuente, tamano, color): superficie}
+
+def cargar_fuente(fuente=None, tamano=24):
+    "Devuelve la fuente pedida, cargándola sólo la primera vez."
+    clave = (fuente, tamano)
+    if clave not in _fuentes:
+        _fuentes[clave] = p.font.Font(fuente, tamano)
+    return _fuentes[clave]
+
+def renderizar(cadena, tamano=24, fuente=None, color=(0, 0, 0)):
+    """Devuelve la superficie con la cadena renderizada. Las últimas
+    MAX_TEXTOS se guardan, así que la superficie es compartida y no se debe
+    modificar."""
+    clave = (cadena, fuente, tamano, tuple(color))
+    superficie = _textos.get(clave)
+    if superficie is None:
+        superficie = cargar_fuente(fuente, tamano).render(cadena, True, color)
+        _textos[clave] = superficie
+        while len(_textos) > MAX_TEXTOS:
+            _textos.popitem(last=False)
+    else:
+        _textos.move_to_end(clave)
+    return superficie
+
 class Texto():
     "Crea un texto para mostrar en pantalla."
     def __init__(
         self, predeterminado = "", tamano = 24, fuente = None, color = (0, 0, 0)
     ):
         "Inicializa el texto."
-        self.fuente = p.font.Font(fuente, tamano)
+        self.fuente = fuente
+        self.tamano = tamano
         self.default = predeterminado
         self.texto = None
         self.rect = None
@@ -22,7 +52,8 @@ class Texto():
         
     def mostrar(self, cadena = ""):
         "Regresa el texto a mostrar."
-        self.texto = self.fuente.render(self.default + cadena, True, self.color)
+        self.texto = renderizar(self.default + cadena, self.tamano, self.fuente,
+                                self.color)
         self.rect = self.texto.get_rect()
         return self.texto
 
@@ -39,6 +70,7 @@ class TecladoPantalla():
         -- self.opc:        Indicador de la posición del cursor en opciones.
         -- self.controles:  Bandera para saber si estamos en texto o controles.
         -- self.completado: Bandera para indicar si se completa el registro.
+        -- self.atlas:      Atlas de glifos ya construidos, ver glifos().
         """
         if teclado is None:
             self.teclado = [
@@ -57,6 +89,7 @@ class TecladoPantalla():
         self.opc = 0            #Opción seleccionada inicialmente.
         self.controles = False  #Bandera para saber si estamos en los controles.
         self.completado = False #Bandera para saber si terminó.
+        self.atlas = {}         #Atlas de glifos por tamaño, fuente y colores.
         
     def dir_derecha(self):
         "Acciones a ser tomadas al presionar la tecla flecha derecha."
@@ -123,6 +156,107 @@ class TecladoPantalla():
                     self.enter_presionado()
 
 
+    def glifos(self, tamano=14, fuente=None, colores=((0xFF,0xFF,0xFF),)):
+        """
+        Devuelve el atlas de glifos para el tamaño, la fuente y los colores
+        dados: una superficie con cada carácter del teclado, el guión bajo, el
+        espacio y cada comando renderizados en cada color, y el diccionario
+        {(etiqueta, color): rect} de su área en la superficie. Se construye
+        sólo la primera vez.
+        """
+        colores = tuple(tuple(color) for color in colores)
+        clave = (tamano, fuente, colores)
+        if clave in self.atlas:
+            return self.atlas[clave]
+        #El display separa los caracteres con espacios, estén o no en el
+        #teclado.
+        etiquetas = sorted(set("".join(self.teclado) + "_ ")) + self.opcs
+        renders = [(etiqueta, color,
+                    renderizar(etiqueta, tamano, fuente, color))
+                   for color in colores for etiqueta in etiquetas]
+        ancho = sum(render.get_width() for _, _, render in renders)
+        alto = max(render.get_height() for _, _, render in renders)
+        superficie = p.Surface((ancho, alto), flags=p.SRCALPHA)
+        superficie.fill((0, 0, 0, 0))
+        areas = {}
+        x = 0
+        for etiqueta, color, render in renders:
+            #Con el atlas transparente, el máximo copia el glifo tal cual.
+            superficie.blit(render, (x, 0), special_flags=p.BLEND_RGBA_MAX)
+            areas[(etiqueta, color)] = p.Rect((x, 0), render.get_size())
+            x += render.get_width()
+        self.atlas[clave] = superficie, areas
+        return self.atlas[clave]
+
+    def piezas_teclado(self, pantalla, tamano=14, fuente=None,
+        color=(0xFF,0xFF,0x00), color2=(0xFF,0xFF,0xFF), pos_y=64, inc_y=16):
+        """
+        Lista de blits (superficie, posición, área) de los caracteres del
+        teclado, para Surface.blits. Los argumentos son los de
+        dibujar_teclado.
+        """
+        superficie, areas = self.glifos(tamano, fuente, (color, color2))
+        color, color2 = tuple(color), tuple(color2)
+        piezas = []
+        for fila in range(len(self.teclado)):
+            pos_x = pantalla.get_size()[0] / (len(self.teclado[fila]) + 1)
+            for col in range(len(self.teclado[0])):
+                caracter = self.teclado[fila][col]
+                if [fila, col] == self.sel:
+                    area = areas[(caracter, color)]
+                else:
+                    area = areas[(caracter, color2)]
+                piezas.append((superficie,
+                               (pos_x * (col+1) - area.width // 2, pos_y),
+                               area))
+            pos_y += inc_y
+        return piezas
+
+    def piezas_display(self, pantalla, tamano=14, fuente=None,
+        color=(0xFF,0xFF,0xFF), pos_x=None, pos_y=None):
+        """
+        Lista de blits (superficie, posición, área) del display, para
+        Surface.blits. Los argumentos son los de dibujar_display.
+        """
+        superficie, areas = self.glifos(tamano, fuente, (color,))
+        color = tuple(color)
+        cadena = ""
+        for caracter in self.cadena:
+            cadena += caracter + " "
+        while len(cadena) < self.len * 2:
+            cadena += "_ "
+        glifos = [areas[(caracter, color)] for caracter in cadena]
+        if pos_x is None:
+            pos_x = pantalla.get_size()[0] / 2 - \
+                    sum(area.width for area in glifos) // 2
+        if pos_y is None:
+            pos_y = 0
+        piezas = []
+        for area in glifos:
+            piezas.append((superficie, (pos_x, pos_y), area))
+            pos_x += area.width
+        return piezas
+
+    def piezas_comandos(self, pantalla, tamano=14, fuente=None,
+        color=(0xFF,0xFF,0x00), color2=(0xFF,0xFF,0xFF), pos_y=None):
+        """
+        Lista de blits (superficie, posición, área) de los comandos, para
+        Surface.blits. Los argumentos son los de dibujar_comandos.
+        """
+        superficie, areas = self.glifos(tamano, fuente, (color, color2))
+        color, color2 = tuple(color), tuple(color2)
+        if pos_y is None:
+            pos_y = pantalla.get_size()[1] / 10 * 9
+        piezas = []
+        for cmd in range(len(self.opcs)):
+            if self.controles and self.opc == cmd:
+                area = areas[(self.opcs[cmd], color)]
+            else:
+                area = areas[(self.opcs[cmd], color2)]
+            pos_x = pantalla.get_size()[0] / (len(self.opcs) + 1) * (cmd+1)
+            piezas.append((superficie, (pos_x, pos_y), area))
+        return piezas
+
     def dibujar_teclado(self, pantalla, tamano=14, fuente=None, 
         color=(0xFF,0xFF,0x00), color2=(0xFF,0xFF,0xFF), pos_y=64, inc_y=16):
         """
@@ -135,18 +269,8 @@ class TecladoPantalla():
         -- pos_y:    Posición vertical inicial de los caracteres.
         -- inc_y:    Espaciado vertical entre caracteres.
         """
-        #Dibujando los caracteres del teclado.
-        for fila in range(len(self.teclado)):
-            for col in range(len(self.teclado[0])):
-                caracter = self.teclado[fila][col]
-                if [fila, col] == self.sel:
-                    texto = Texto(caracter, tamano, fuente, color)
-                else:
-                    texto = Texto(caracter, tamano, fuente, color2)
-                pos_x = pantalla.get_size()[0] / (len(self.teclado[fila]) + 1)
-                pos_x = pos_x * (col+1) - texto.rect.centerx
-                pantalla.blit(texto.mostrar(), (pos_x, pos_y))
-            pos_y += inc_y
+        pantalla.blits(self.piezas_teclado(pantalla, tamano, fuente, color,
+                                           color2, pos_y, inc_y), False)
             
     def dibujar_display(self, pantalla, tamano=14, fuente=None, 
         color=(0xFF,0xFF,0xFF), pos_x=None, pos_y=None):
@@ -159,17 +283,8 @@ class TecladoPantalla():
         -- pos_x:    Coordenada en X donde inicia el display.
         -- pos_y:    Coordenada en Y donde inicia el display.
         """
-        cadena = ""
-        for caracter in self.cadena:
-            cadena += caracter + " "
-        while len(cadena) < self.len * 2:
-            cadena += "_ "
-        texto = Texto(cadena, tamano, fuente, color)
-        if pos_x is None:
-            pos_x = pantalla.get_size()[0] / 2 - texto.rect.centerx
-        if pos_y is None:
-            pos_y = 0
-        pantalla.blit(texto.mostrar(), (pos_x, pos_y))
+        pantalla.blits(self.piezas_display(pantalla, tamano, fuente, color,
+                                           pos_x, pos_y), False)
         
     def dibujar_comandos(self, pantalla, tamano=14, fuente=None, 
         color=(0xFF,0xFF,0x00), color2=(0xFF,0xFF,0xFF), pos_y=None):
@@ -182,12 +297,5 @@ class TecladoPantalla():
         -- color2:   Color del texto no seleccionado.
         -- pos_y:    Coordenada en Y donde se dibujan las opciones.
         """
-        for cmd in range(len(self.opcs)):
-            if self.controles and self.opc == cmd:
-                texto = Texto(self.opcs[cmd], tamano, fuente, color)
-            else:
-                texto = Texto(self.opcs[cmd], tamano, fuente, color2)
-            pos_x = pantalla.get_size()[0] / (len(self.opcs) + 1) * (cmd+1)
-            if pos_y is None:
-                pos_y = pantalla.get_size()[1] / 10 * 9
-            pantalla.blit(texto.mostrar(), (pos_x, pos_y))
+        pantalla.blits(self.piezas_comandos(pantalla, tamano, fuente, color,
+                                            color2, pos_y), False)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Paquete de imágenes ya decodificadas, para arrancar sin leer y decodificar
+cada archivo de media/ por separado:
+
+    python -m pyjuego.paquete media media/recursos.paq
+
+El paquete empieza con MAGIA, la longitud del índice y el índice en JSON,
+{ruta: [posición, ancho, alto, fecha]}, seguido de los pixeles RGBA de cada
+imagen. Al abrirlo se mapea en memoria y cada imagen se crea con
+p.image.frombuffer sobre su parte del mapa.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame as p
+
+MAGIA = b'EKPAQ001'
+EXTENSIONES = ('.png', '.gif', '.tga', '.bmp', '.jpg')
+ALINEACION = 16     #Los pixeles de cada imagen empiezan en un múltiplo.
+
+def construir(directorio, destino):
+    """Empaqueta todas las imágenes de directorio en destino. Devuelve el
+    número de imágenes."""
+    indice = {}
+    datos = []
+    posicion = 0
+    for raiz, dirs, archivos in os.walk(directorio):
+        dirs.sort()
+        for archivo in sorted(archivos):
+            if not archivo.lower().endswith(EXTENSIONES):
+                continue
+            ruta = os.path.normpath(os.path.join(raiz, archivo))
+            imagen = p.image.load(ruta)
+            #El color transparente de los GIF queda como alfa 0.
+            pixeles = p.image.tobytes(imagen, 'RGBA')
+            relleno = -posicion % ALINEACION
+            datos.append(b'\0' * relleno + pixeles)
+            posicion += relleno
+            indice[ruta] = [posicion, imagen.get_width(), imagen.get_height(),
+                            os.path.getmtime(ruta)]
+            posicion += len(pixeles)
+    cabecera = json.dumps(indice, sort_keys=True).encode('utf-8')
+    inicio = len(MAGIA) + 4 + len(cabecera)
+    inicio += -inicio % ALINEACION
+    temporal = destino + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(MAGIA)
+        f.write(struct.pack('<I', len(cabecera)))
+        f.write(cabecera)
+        f.write(b'\0' * (inicio - f.tell()))
+        for dato in datos:
+            f.write(dato)
+    os.replace(temporal, destino)
+    return len(indice)
+
+class Paquete():
+    """Paquete de imágenes abierto. Una imagen se sirve del paquete sólo si su
+    archivo no cambió después de empaquetarla."""
+    def __init__(self, ruta):
+        "Mapea el paquete en memoria y lee su índice."
+        with open(ruta, 'rb') as f:
+            self.mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mapa[:len(MAGIA)] != MAGIA:
+            raise ValueError("%s no es un paquete de imágenes" % ruta)
+        longitud, = struct.unpack_from('<I', self.mapa, len(MAGIA))
+        inicio = len(MAGIA) + 4
+        self.indice = json.loads(
+            self.mapa[inicio:inicio + longitud].decode('utf-8'))
+        inicio += longitud
+        self.inicio = inicio + (-inicio % ALINEACION)
+
+    def imagen(self, ruta):
+        """Superficie RGBA de la imagen de ruta sobre el mapa del paquete, o
+        None si no está o su archivo es más nuevo."""
+        entrada = self.indice.get(os.path.normpath(ruta))
+        if entrada is None:
+            return None
+        posicion, ancho, alto, fecha = entrada
+        try:
+            if os.path.getmtime(ruta) > fecha:
+                return None
+        except OSError:
+            pass    #Sin el archivo sólo queda el paquete.
+        posicion += self.inicio
+        pixeles = memoryview(self.mapa)[posicion:posicion + ancho * alto * 4]
+        return p.image.frombuffer(pixeles, (ancho, alto), 'RGBA')
+
+def main(argv=None):
+    "Construye el paquete desde la línea de órdenes."
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Uso: python -m pyjuego.paquete DIRECTORIO PAQUETE")
+        return 2
+    n = construir(argv[0], argv[1])
+    print("%d imágenes en %s" % (n, argv[1]))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Perfil de los cuadros del juego: cuánto tarda cada fase del ciclo del Director
+y cada tramo con nombre que midan las escenas.
+"""
+
+import csv
+import time
+
+import numpy
+import pygame as p
+
+from pyjuego.objetos import renderizar
+
+#Fases del ciclo principal, en el orden en que las marca el Director.
+FASES = ('eventos', 'actualizar', 'dibujar', 'mostrar')
+
+class _Tramo():
+    "Mide el tiempo de un bloque with y lo suma al cuadro actual."
+    __slots__ = ('perfil', 'nombre', 'inicio')
+
+    def __init__(self, perfil, nombre):
+        self.perfil = perfil
+        self.nombre = nombre
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *excepcion):
+        self.perfil.sumar(self.nombre, time.perf_counter() - self.inicio)
+
+class _Nulo():
+    "Tramo que no mide nada, para cuando el perfil está apagado."
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *excepcion):
+        pass
+
+_NULO = _Nulo()
+
+class Perfil():
+    """Tiempos por cuadro de las fases del ciclo y de los tramos con nombre.
+
+    Los últimos capacidad cuadros se guardan en un búfer circular por nombre,
+    de donde salen los percentiles, la capa en pantalla y el CSV. Se mide
+    mientras se graba o se ve la capa, cada cosa con su interruptor, así que
+    se puede grabar sin la capa encima. Apagado, el Director no mide nada y
+    tramo() devuelve un bloque vacío, así que el costo es una comprobación
+    por fase:
+
+        with perfil.tramo('niebla'):
+            ...
+    """
+    def __init__(self, capacidad=600, refresco=30):
+        """
+        Inicializa el perfil apagado:
+        -- capacidad: Cuadros que se guardan.
+        -- refresco:  Cada cuántos cuadros se actualiza la capa en pantalla.
+        """
+        self.grabando = False
+        self.visible = False
+        self.capacidad = capacidad
+        self.refresco = refresco
+        self.muestras = {}  #{nombre: segundos por cuadro, NaN si no hubo}
+        self.cuadros = 0    #Cuadros registrados desde el inicio.
+        self.actual = {}    #{nombre: segundos} del cuadro en curso.
+        self.ultimo = 0.0
+        self.capa = None
+
+    @property
+    def activo(self):
+        "Si se miden los cuadros."
+        return self.grabando or self.visible
+
+    def alternar(self):
+        "Muestra u oculta la capa en pantalla."
+        self.visible = not self.visible
+        self.capa = None
+
+    def alternar_grabacion(self):
+        "Empieza o deja de grabar los cuadros sin mostrar la capa."
+        self.grabando = not self.grabando
+
+    def empezar(self):
+        "Marca el inicio de un cuadro."
+        self.actual = {}
+        self.ultimo = time.perf_counter()
+
+    def marcar(self, fase):
+        "Suma a fase el tiempo desde la marca anterior."
+        ahora = time.perf_counter()
+        self.sumar(fase, ahora - self.ultimo)
+        self.ultimo = ahora
+
+    def saltar(self):
+        "Descarta el tiempo desde la marca anterior, sin sumarlo a nada."
+        self.ultimo = time.perf_counter()
+
+    def sumar(self, nombre, segundos):
+        "Suma segundos a nombre en el cuadro en curso."
+        self.actual[nombre] = self.actual.get(nombre, 0.0) + segundos
+
+    def tramo(self, nombre):
+        "Bloque with que suma su duración a nombre."
+        if not self.activo:
+            return _NULO
+        return _Tramo(self, nombre)
+
+    def terminar(self):
+        "Guarda el cuadro en curso en el búfer circular."
+        i = self.cuadros % self.capacidad
+        for nombre in self.actual:
+            if nombre not in self.muestras:
+                self.muestras[nombre] = numpy.full(self.capacidad, numpy.nan)
+        for nombre, muestras in self.muestras.items():
+            muestras[i] = self.actual.get(nombre, numpy.nan)
+        self.actual = {}
+        self.cuadros += 1
+        if self.cuadros % self.refresco == 0:
+            self.capa = None
+
+    def percentiles(self, nombre, q=(50, 95, 99)):
+        "Percentiles q en milisegundos de nombre, NaN si no hay muestras."
+        muestras = self.muestras.get(nombre)
+        if muestras is None or numpy.isnan(muestras).all():
+            return [numpy.nan] * len(q)
+        return [float(valor) * 1000
+                for valor in numpy.nanpercentile(muestras, q)]
+
+    def nombres(self):
+        "Las fases y después los tramos, en orden alfabético."
+        tramos = sorted(nombre for nombre in self.muestras
+                        if nombre not in FASES)
+        return [fase for fase in FASES if fase in self.muestras] + tramos
+
+    def dibujar(self, pantalla, pos=(4, 4)):
+        """Dibuja la tabla de percentiles y devuelve su rectángulo. Se
+        recompone cada refresco cuadros."""
+        if self.capa is None:
+            lineas = ["%-12s %6s %6s %6s" % ("ms", "p50", "p95", "p99")]
+            for nombre in self.nombres():
+                lineas.append("%-12s %6.2f %6.2f %6.2f" % (
+                    (nombre,) + tuple(self.percentiles(nombre))))
+            textos = [renderizar(linea, 18, color=(255, 255, 255))
+                      for linea in lineas]
+            ancho = max(texto.get_width() for texto in textos) + 8
+            alto = sum(texto.get_height() for texto in textos) + 8
+            self.capa = p.Surface((ancho, alto), flags=p.SRCALPHA)
+            self.capa.fill((0, 0, 0, 160))
+            y = 4
+            for texto in textos:
+                self.capa.blit(texto, (4, y))
+                y += texto.get_height()
+        return pantalla.blit(self.capa, pos)
+
+    def guardar(self, ruta):
+        """Escribe en ruta un CSV con los tiempos en milisegundos de cada
+        cuadro guardado, del más antiguo al más reciente."""
+        nombres = self.nombres()
+        n = min(self.cuadros, self.capacidad)
+        with open(ruta, 'w', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(['cuadro'] + nombres)
+            for cuadro in range(self.cuadros - n, self.cuadros):
+                fila = [cuadro]
+                for nombre in nombres:
+                    valor = self.muestras[nombre][cuadro % self.capacidad]
+                    fila.append('' if numpy.isnan(valor)
+                                else '%.4f' % (valor * 1000))
+                escritor.writerow(fila)
+
+perfil = Perfil()   #Perfil del juego, lo usan el Director y las escenas.
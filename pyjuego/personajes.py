@@ -39,6 +39,8 @@ class PykittenSprite(Sprite):
         self.vel = (0, 0)
         #Similar a vel, pero utilizado para generar movimiento en una sola dir.
         self.speed = 1
+        #Posición antes de la última actualización, para interpolar.
+        self.previa = self.rect.topleft
 
     def set_vel(self, vel):
         """Velocidad en (x, y)."""
@@ -55,11 +57,31 @@ class PykittenSprite(Sprite):
 
     def update(self):
         """Actualiza la posicion del sprite en base a su velocidad."""
+        self.previa = self.rect.topleft
         if self.moving:
             self.rect.x += self.vel[0]
             self.rect.y += self.vel[1]
         #print self.vel
 
+    def desplazar(self, dx, dy):
+        """Mueve el sprite sin que cuente como movimiento, también su
+        posición anterior."""
+        self.rect.move_ip(dx, dy)
+        self._rect.move_ip(dx, dy)
+        self.previa = (self.previa[0] + dx, self.previa[1] + dy)
+
+    def interpolar(self, alfa):
+        """Lleva el rect a la posición a una fracción alfa del camino entre la
+        anterior a la última actualización y la actual, para dibujarlo.
+        restaurar() devuelve la posición real."""
+        self.real = x, y = self.rect.topleft
+        self.rect.x = int(round(self.previa[0] + (x - self.previa[0]) * alfa))
+        self.rect.y = int(round(self.previa[1] + (y - self.previa[1]) * alfa))
+
+    def restaurar(self):
+        """Devuelve el rect a la posición real tras interpolar()."""
+        self.rect.topleft = self.real
+
 class AnimatedSprite(PykittenSprite):
     """Clase para crear un sprite animado."""
     def __init__(self, images, pos, engine, delay = 5):
@@ -158,9 +180,11 @@ class CharacterSprite(AnimatedSprite):
         En caso de proveer un motor de tiles, calcula la posición actual.
         """
         if self.movedir is not None:
-            #Calcular la posición del nuevo tile.
+            #Calcular la posición del nuevo tile. El rect está en pixeles del
+            #mapa, sin el desplazamiento de la vista.
             self._tile = self.tile
-            self.tile = self.motor.screen_to_tile(self.compensate())
+            tx, ty = self.motor.view_to_tile(self.compensate())
+            self.tile = (int(tx), int(ty))
             #Movimiento.
             direction = self.movedir
             if not self.moving or direction != self.cur_dir:
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Caché de los recursos gráficos del juego, para leer cada imagen del disco una
+sola vez.
+"""
+
+import os
+from collections import OrderedDict
+
+import pygame as p
+from pyjuego.paquete import Paquete
+
+class Recursos():
+    """Imágenes ya convertidas al formato de la pantalla, por ruta y alpha.
+
+    Las superficies se comparten entre todas las escenas que las piden, así
+    que no se deben modificar. Con un límite en bytes se descartan las menos
+    usadas recientemente cuando se supera; sin límite no se descarta nada.
+    Con un paquete abierto (ver pyjuego.paquete) las imágenes se toman de él
+    en lugar de decodificar su archivo.
+    """
+    def __init__(self, limite=None):
+        "Inicializa la caché, con un límite en bytes opcional."
+        self.limite = limite
+        self.imagenes = OrderedDict()   #{(ruta, alpha): superficie}
+        self.bytes = 0
+        self.paquete = None
+
+    def abrir(self, ruta):
+        "Usa el paquete de imágenes de ruta."
+        self.paquete = Paquete(ruta)
+
+    def imagen(self, ruta, alpha=False):
+        """Devuelve la imagen de ruta convertida, con convert_alpha() si alpha
+        es verdadero. Sólo se lee del disco si no estaba en la caché."""
+        clave = (os.path.normpath(ruta), bool(alpha))
+        imagen = self.imagenes.get(clave)
+        if imagen is not None:
+            self.imagenes.move_to_end(clave)
+            return imagen
+        if self.paquete is not None:
+            imagen = self.paquete.imagen(clave[0])
+        if imagen is None:
+            try:
+                imagen = p.image.load(clave[0])
+            except:
+                print("No se puede cargar la imagen: ", clave[0])
+                raise
+        if alpha:
+            imagen = imagen.convert_alpha()
+        else:
+            imagen = imagen.convert()
+        self.imagenes[clave] = imagen
+        self.bytes += self.tamano(imagen)
+        self.descartar()
+        return imagen
+
+    def precargar(self, imagenes):
+        "Carga de una vez una lista de imágenes (ruta, alpha)."
+        for ruta, alpha in imagenes:
+            self.imagen(ruta, alpha)
+
+    def descartar(self):
+        """Descarta las imágenes menos usadas hasta quedar dentro del límite.
+        La más reciente siempre se queda."""
+        if self.limite is None:
+            return
+        while self.bytes > self.limite and len(self.imagenes) > 1:
+            clave, imagen = self.imagenes.popitem(last=False)
+            self.bytes -= self.tamano(imagen)
+
+    def vaciar(self):
+        "Descarta todas las imágenes."
+        self.imagenes.clear()
+        self.bytes = 0
+
+    @staticmethod
+    def tamano(imagen):
+        "Bytes que ocupan los pixeles de una superficie."
+        return imagen.get_pitch() * imagen.get_height()
+
+recursos = Recursos()   #Caché compartida por todo el juego.
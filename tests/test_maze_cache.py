@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+
+from pyjuego.maze import Maze, distance_field
+from pyjuego.maze_cache import MazeCache
+
+
+def test_oversized_entry_is_not_stored(tmp_path):
+    cache = MazeCache(str(tmp_path), max_bytes=4096)
+    small = numpy.zeros((8, 8), dtype=numpy.int8)
+    assert cache.store('small', small, small, small)
+    big = numpy.zeros((64, 64), dtype=numpy.int32)
+    assert not cache.store('big', small, big, small)
+    assert cache.load('big') is None
+    # The entries already stored are not evicted to make room.
+    assert cache.load('small') is not None
+
+
+def test_distances_use_the_smallest_dtype():
+    maze = Maze(21, 21, seed=1)
+    assert maze.distances.dtype == numpy.int8
+    assert maze.distances.min() == -1
+    corridor = numpy.ones((3, 302), dtype=numpy.int8)
+    corridor[1, 1:-1] = 0
+    distances = distance_field(corridor, (1, 1))
+    assert distances.dtype == numpy.int16
+    assert distances[1, -2] == 299
+
+
+def test_cached_maze_round_trip(tmp_path):
+    Maze.cache = MazeCache(str(tmp_path))
+    try:
+        first = Maze(21, 21, seed=7)
+        second = Maze(21, 21, seed=7)
+    finally:
+        Maze.cache = None
+    assert (first.Z == second.Z).all()
+    assert (first.distances == second.distances).all()
+    assert second.start == first.start
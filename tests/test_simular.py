@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+pytest.importorskip('pgu')
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_simular_escena_juego(monkeypatch):
+    monkeypatch.setenv('SDL_VIDEODRIVER', 'dummy')
+    #Las rutas de media/ son relativas a la raíz del juego.
+    monkeypatch.chdir(RAIZ)
+    import ekmaze
+    cuadros, segundos, fps = ekmaze.simular(300, semilla=1)
+    assert cuadros == 300
+    assert fps > 0